@@ -1,93 +1,57 @@
 from sqlalchemy import text
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, jsonify, g, stream_with_context
 import os
 from datetime import datetime
 import random  # 用于生成随机颜色
 
-app = Flask(__name__)
-app.secret_key = 'your_secret_key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///forklift.db'
-db = SQLAlchemy(app)
-
-# 数据库模型
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
-    points = db.Column(db.Integer, default=100)  # 注册赠送100分
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class Document(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    price = db.Column(db.Integer, nullable=False)  # 阅读价格（≥100分）
-    status = db.Column(db.String(20), default='pending')  # pending/approved/rejected
-    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    read_count = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    author = db.relationship('User', backref=db.backref('documents', lazy=True))
-
-class Transaction(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    document_id = db.Column(db.Integer, db.ForeignKey('document.id'))
-    amount = db.Column(db.Integer, nullable=False)
-    transaction_type = db.Column(db.String(20))  # read/reward/fee (避免使用type关键字)
-    description = db.Column(db.String(100))  # 交易描述
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user = db.relationship('User', backref=db.backref('transactions', lazy=True))
-
-# 评论模型（修复字段名冲突）
-class Comment(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    content = db.Column(db.Text, nullable=False, default='')  # 添加默认值
-    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    # 评论类型：comment-普通评论，like-点赞，dislike-差评（避免使用type关键字）
-    comment_type = db.Column(db.String(20), default='comment')
-    
-    user = db.relationship('User', backref=db.backref('comments', lazy=True))
-    document = db.relationship('Document', backref=db.backref('comments', lazy=True))
-
-# 社区动态模型
-class CommunityPost(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    content = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user = db.relationship('User', backref=db.backref('community_posts', lazy=True))
-
-# 系统统计表
-class SystemStats(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    total_points_created = db.Column(db.Integer, default=0)  # 系统创建的总积分
-    total_fees_collected = db.Column(db.Integer, default=0)  # 收取的总手续费
-    total_rewards_given = db.Column(db.Integer, default=0)  # 发放的总奖励
-
-# 需求模型
-class Demand(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(100), nullable=False)
-    description = db.Column(db.Text, nullable=False)
-    demand_type = db.Column(db.String(20))  # service/parts
-    points_required = db.Column(db.Integer, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='active')  # active/completed
-    contact_info = db.Column(db.String(100))
-    
-    user = db.relationship('User', backref=db.backref('demands', lazy=True))
-
-# 创建数据库
-with app.app_context():
-    db.create_all()
-    # 初始化系统统计
-    if not SystemStats.query.first():
-        db.session.add(SystemStats())
-        db.session.commit()
+from models import db, User, Document, Transaction, Comment, CommunityPost, SystemStats, Demand
+import assets
+import classify
+import dedup
+import export
+import health
+import history
+import http_cache
+import idempotency
+import ledger
+import query_budget
+import ranking
+import reactions
+import related
+import replicas
+import sessions
+import timeline
+from query_budget import limit_queries
+from replicas import read_only
+from idempotency import idempotent
+from http_cache import conditional
+from ledger import Leg, FEE_POOL, SYSTEM_ISSUANCE, user_account
+from stats import get_snapshot, snapshot_age_seconds
+
+# 模板文件放在项目根目录
+app = Flask(__name__, template_folder='.')
+# 会话 id 用 SECRET_KEY 签名，不能使用公开的默认值；只有调试模式（FLASK_DEBUG=1 或 python app.py）下才使用开发用密钥
+app.secret_key = os.environ.get('SECRET_KEY')
+if not app.secret_key:
+    if not (app.debug or __name__ == '__main__'):
+        raise RuntimeError('未设置 SECRET_KEY 环境变量')
+    app.secret_key = 'dev-only-secret-key'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///forklift.db')
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 表结构由 migrate.py 在部署时单独升级，启动时不做 create_all 和表结构检查
+db.init_app(app)
+# 只读副本（REPLICA_DATABASE_URL），@read_only 的列表页查询走副本
+replicas.init_app(app)
+# 会话存放在服务端（SESSION_BACKEND=sql/redis），cookie 中只有会话 id
+sessions.init_app(app)
+timeline.init_app(app)
+http_cache.init_app(app)
+query_budget.init_app(app)
+assets.init_app(app)
+# 购买、评论等提交带幂等键，重复提交返回第一次的结果
+idempotency.init_app(app)
+# 健康检查接口：/healthz、/readyz、/api/system_status
+health.init_app(app)
 
 # 实用函数
 def calculate_bonus(read_count):
@@ -96,6 +60,55 @@ def calculate_bonus(read_count):
     bonus = min(base + (read_count // 100), 100)  # 最高100分
     return bonus
 
+def get_current_user():
+    """当前登录用户，同一请求内只查询一次并缓存在 g 上"""
+    if 'user_id' not in session:
+        return None
+    if 'current_user' not in g:
+        g.current_user = User.query.get(session['user_id'])
+    return g.current_user
+
+# 文档列表的排序方式（?sort=），hot 读取定时任务刷新的热度分数，走 (status, hot_score) 索引
+DOCUMENT_SORTS = {
+    'hot': ranking.HOT_ORDER,
+    'latest': (Document.created_at.desc(), Document.id.desc()),
+    'price': (Document.price, Document.id),
+}
+
+def document_order(sort):
+    """未知或缺省的排序方式按 id"""
+    return DOCUMENT_SORTS.get(sort, (Document.id,))
+
+# 条件请求使用的数据版本：(版本, 最后修改时间)，都只查索引
+def document_version(doc_id):
+    """文档详情页：阅读量（购买时变化）、最新评论、最近的点赞/差评、相关推荐计算时间和当前用户积分"""
+    user = get_current_user()
+    if user is None:
+        return None, None
+    latest_comment = db.select([db.func.max(Comment.id)]).where(Comment.document_id == Document.id).as_scalar()
+    row = db.session.query(Document.read_count, Document.status, latest_comment,
+                           reactions.changed_at_subquery(doc_id), related.computed_at_subquery(doc_id)) \
+        .filter(Document.id == doc_id).first()
+    if row is None:
+        return None, None
+    return (*row, user.points), None
+
+def comments_version(doc_id):
+    """评论列表：最新一条评论"""
+    latest = db.session.query(Comment.id, Comment.created_at) \
+        .filter(Comment.document_id == doc_id).order_by(Comment.id.desc()).first()
+    if latest is None:
+        return 0, None
+    return latest.id, latest.created_at
+
+def transactions_version():
+    """当前用户的收支汇总：最新一条交易"""
+    if 'user_id' not in session:
+        return None, None
+    latest = db.session.query(db.func.max(Transaction.id)) \
+        .filter(Transaction.user_id == session['user_id']).scalar()
+    return latest or 0, None
+
 # 模板辅助函数
 @app.context_processor
 def utility_processor():
@@ -106,25 +119,33 @@ def utility_processor():
 
 # ========== 路由定义 ==========
 @app.route('/')
+@read_only
+@limit_queries(4)
 def home():
     """首页 - 显示已审核文档"""
+    sort = request.args.get('sort')
     try:
-        documents = Document.query.filter_by(status='approved').all()
+        documents = Document.query.options(db.joinedload(Document.author)).filter_by(status='approved') \
+            .order_by(*document_order(sort)).all()
         
-        # 获取最新社区动态
-        community_posts = CommunityPost.query.order_by(CommunityPost.created_at.desc()).limit(10).all()
+        # 最新社区动态（读取内存中的时间线）
+        community_posts = timeline.latest(10)
         
         # 获取最新需求
         latest_demands = Demand.query.filter_by(status='active').order_by(Demand.created_at.desc()).limit(5).all()
         
+        # 首页列出全部已审核文档，按状态过滤统计，不把每个 id 作为参数传入
+        approved = db.select([Document.id]).where(Document.status == 'approved')
         return render_template('index.html', 
                               documents=documents, 
+                              sort=sort,
+                              doc_comment_counts=history.comment_counts([doc.id for doc in documents], approved),
                               community_posts=community_posts,
                               latest_demands=latest_demands)
     except Exception as e:
         app.logger.error(f"首页错误: {str(e)}")
         # 提供降级内容而不是完全失败
-        return render_template('index.html', documents=[], community_posts=[], latest_demands=[])
+        return render_template('index.html', documents=[], sort=sort, doc_comment_counts={}, community_posts=[], latest_demands=[])
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -142,8 +163,15 @@ def register():
                 flash('用户名已存在', 'danger')
                 return redirect(url_for('register'))
             
-            new_user = User(username=username, password=password)
+            new_user = User(username=username, password=password, points=0)
             db.session.add(new_user)
+            db.session.flush()
+            
+            # 注册赠送积分由系统发行账户转入
+            ledger.post([
+                Leg(SYSTEM_ISSUANCE, -100, 'signup'),
+                Leg(user_account(new_user.id), 100, 'signup'),
+            ], description='注册赠送积分')
             db.session.commit()
             
             flash('注册成功！获得100初始积分', 'success')
@@ -171,6 +199,7 @@ def login():
             user = User.query.filter_by(username=username, password=password).first()
             
             if user:
+                sessions.regenerate(session)
                 session['user_id'] = user.id
                 session['username'] = user.username
                 return redirect(url_for('dashboard'))
@@ -194,14 +223,25 @@ def logout():
         print(f"登出错误: {str(e)}")
         return redirect(url_for('home'))
 
+@app.route('/logout_all', methods=['POST'])
+def logout_all():
+    """退出所有设备上的登录"""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    app.session_interface.logout_everywhere(session['user_id'])
+    session.clear()
+    return redirect(url_for('home'))
+
 @app.route('/dashboard')
+@limit_queries(3)
 def dashboard():
     """用户仪表盘"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
     try:
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         if not user:
             flash('用户不存在', 'danger')
             return redirect(url_for('login'))
@@ -214,10 +254,8 @@ def dashboard():
         # 计算总积分（简化处理，实际应从交易记录获取）
         total_points = user.points
         
-        # 计算点赞数（简化处理）
-        total_likes = 0
-        for doc in user_docs:
-            total_likes += Comment.query.filter_by(document_id=doc.id, comment_type='like').count()
+        # 计算点赞数（一次联表计数）
+        total_likes = reactions.likes_received(user.id)
         
         # 添加调试信息
         print(f"用户仪表盘: 用户={user.username}, 文档数={len(user_docs)}")
@@ -270,11 +308,15 @@ def submit_document():
                 status='pending'
             )
             
-            # 保存到数据库
+            # 保存到数据库，同一事务中建立查重索引并标记疑似重复
             db.session.add(new_doc)
+            db.session.flush()
+            duplicate = dedup.index_document(new_doc)
             db.session.commit()
             
             flash('文档已提交，等待审核', 'success')
+            if duplicate:
+                flash(f'该文档与已有文档 #{duplicate[0]} 高度相似（{duplicate[1]:.0%}），审核时将一并核对', 'warning')
             return redirect(url_for('dashboard'))
         
         return render_template('submit_document.html')
@@ -287,47 +329,41 @@ def submit_document():
         return redirect(url_for('submit_document'))
 
 @app.route('/document/<int:doc_id>')
+@limit_queries(8)
+@conditional(document_version)
 def view_document(doc_id):
     """查看文档详情（付费阅读）"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
     try:
-        doc = Document.query.get_or_404(doc_id)
-        user = User.query.get(session['user_id'])
-        
-        # 计算评论统计数据
-        likes_count = Comment.query.filter_by(document_id=doc_id, comment_type='like').count()
-        dislikes_count = Comment.query.filter_by(document_id=doc_id, comment_type='dislike').count()
-        comments_count = Comment.query.filter_by(document_id=doc_id, comment_type='comment').count()
-        
-        # 检查当前用户是否已经点赞/差评
-        user_liked = Comment.query.filter_by(
-            document_id=doc_id, 
-            user_id=session['user_id'], 
-            comment_type='like'
-        ).first() is not None
-        
-        user_disliked = Comment.query.filter_by(
-            document_id=doc_id, 
-            user_id=session['user_id'], 
-            comment_type='dislike'
-        ).first() is not None
-        
-        # 检查是否已购买
-        if Transaction.query.filter_by(
-            user_id=user.id, 
-            document_id=doc.id,
-            transaction_type='read'
-        ).first():
+        doc = Document.query.options(db.joinedload(Document.author)).get_or_404(doc_id)
+        user = get_current_user()
+        
+        # 计算评论统计数据（含已归档的评论）
+        counts = history.comment_counts([doc_id])[doc_id]
+        likes_count, dislikes_count, comments_count = counts['like'], counts['dislike'], counts['comment']
+        
+        # 检查当前用户是否已经点赞/差评（主键查询）
+        user_reaction = reactions.user_reaction(doc_id, session['user_id'])
+        user_liked, user_disliked = user_reaction == 'like', user_reaction == 'dislike'
+        
+        # 评论只取第一页（评论者用户名在同一查询中），更多的由页面通过 get_comments 翻页加载
+        comments, next_cursor = history.comments_page(doc_id)
+        
+        # 检查是否已购买（作者可直接阅读自己的文档）
+        if doc.author_id == user.id or history.has_purchased(user.id, doc.id):
             return render_template('document_detail.html', 
                                   document=doc, 
                                   content=doc.content,
+                                  related_documents=related.for_document(doc.id),
                                   likes_count=likes_count,
                                   dislikes_count=dislikes_count,
                                   comments_count=comments_count,
                                   user_liked=user_liked,
-                                  user_disliked=user_disliked)
+                                  user_disliked=user_disliked,
+                                  comments=comments,
+                                  next_cursor=next_cursor)
         
         # 检查积分是否足够
         if user.points < doc.price:
@@ -336,17 +372,21 @@ def view_document(doc_id):
         
         return render_template('document_detail.html', 
                               document=doc,
+                              related_documents=related.for_document(doc.id),
                               likes_count=likes_count,
                               dislikes_count=dislikes_count,
                               comments_count=comments_count,
                               user_liked=user_liked,
-                              user_disliked=user_disliked)
+                              user_disliked=user_disliked,
+                              comments=comments,
+                              next_cursor=next_cursor)
     except Exception as e:
         print(f"查看文档错误: {str(e)}")
         flash('加载文档时出错', 'danger')
         return redirect(url_for('home'))
 
 @app.route('/purchase_document/<int:doc_id>', methods=['POST'])
+@idempotent
 def purchase_document(doc_id):
     """购买文档阅读权限（含10%手续费）"""
     if 'user_id' not in session:
@@ -354,7 +394,7 @@ def purchase_document(doc_id):
     
     try:
         doc = Document.query.get_or_404(doc_id)
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         stats = SystemStats.query.first()
         
         if user.points < doc.price:
@@ -365,29 +405,13 @@ def purchase_document(doc_id):
         platform_fee = max(1, int(doc.price * 0.1))  # 至少1分
         author_earnings = doc.price - platform_fee
         
-        # 扣除读者积分
-        user.points -= doc.price
-        
-        # 奖励作者积分
-        author = User.query.get(doc.author_id)
-        author.points += author_earnings
-        
-        # 记录交易
-        fee_transaction = Transaction(
-            user_id=user.id,
-            document_id=doc.id,
-            amount=-platform_fee,
-            transaction_type='fee',
-            description=f'平台手续费 ({doc.price}的10%)'
-        )
-        
-        author_transaction = Transaction(
-            user_id=author.id,
-            document_id=doc.id,
-            amount=author_earnings,
-            transaction_type='read',
-            description=f'文档收入 (扣除{platform_fee}手续费)'
-        )
+        # 读者付款给作者，作者再向手续费池支付手续费
+        ledger.post([
+            Leg(user_account(user.id), -doc.price, 'purchase', f'购买文档阅读权限 ({doc.price}分)'),
+            Leg(user_account(doc.author_id), doc.price, 'read', f'文档收入 (实得{author_earnings}分)'),
+            Leg(user_account(doc.author_id), -platform_fee, 'fee', f'平台手续费 ({doc.price}的10%)'),
+            Leg(FEE_POOL, platform_fee, 'fee'),
+        ], document_id=doc.id)
         
         # 更新阅读计数
         doc.read_count += 1
@@ -398,32 +422,31 @@ def purchase_document(doc_id):
         # 检查阅读量奖励
         if doc.read_count % 100 == 0:
             bonus = calculate_bonus(doc.read_count)
-            author.points += bonus
             stats.total_rewards_given += bonus
-            
-            bonus_transaction = Transaction(
-                user_id=author.id,
-                document_id=doc.id,
-                amount=bonus,
-                transaction_type='reward',
-                description=f'阅读量达到{doc.read_count}奖励'
-            )
-            db.session.add(bonus_transaction)
+            ledger.post([
+                Leg(SYSTEM_ISSUANCE, -bonus, 'reward'),
+                Leg(user_account(doc.author_id), bonus, 'reward'),
+            ], document_id=doc.id, description=f'阅读量达到{doc.read_count}奖励')
         
-        db.session.add(fee_transaction)
-        db.session.add(author_transaction)
         db.session.commit()
         
         flash(f'成功支付{doc.price}积分（含{platform_fee}平台手续费）', 'success')
         return redirect(url_for('view_document', doc_id=doc.id))
+    except ValueError as e:
+        # 账本扣款时发现余额不足（并发购买）
+        db.session.rollback()
+        flash(str(e), 'danger')
+        return redirect(url_for('view_document', doc_id=doc_id))
     except Exception as e:
         db.session.rollback()
+        idempotency.discard()
         print(f"购买文档错误: {str(e)}")
         flash('购买文档时出错，请重试', 'danger')
         return redirect(url_for('view_document', doc_id=doc_id))
 
 # 添加评论路由
 @app.route('/add_comment/<int:doc_id>', methods=['POST'])
+@idempotent
 def add_comment(doc_id):
     """添加评论"""
     if 'user_id' not in session:
@@ -434,8 +457,14 @@ def add_comment(doc_id):
         comment_type = request.form.get('comment_type', 'comment')  # 修改为 comment_type
         content = request.form.get('content', '')
         
-        # 如果是点赞或差评，不需要内容
-        if comment_type == 'comment' and not content.strip():
+        # 点赞或差评：再次点击取消，点赞和差评互相切换
+        if comment_type in reactions.REACTION_TYPES:
+            current = reactions.toggle(doc_id, session['user_id'], comment_type)
+            db.session.commit()
+            flash({'like': '已点赞', 'dislike': '已差评'}.get(current, '已取消'), 'success')
+            return redirect(url_for('view_document', doc_id=doc_id))
+        
+        if comment_type != 'comment' or not content.strip():
             flash('评论内容不能为空', 'danger')
             return redirect(url_for('view_document', doc_id=doc_id))
         
@@ -443,7 +472,7 @@ def add_comment(doc_id):
             content=content,
             document_id=doc_id,
             user_id=session['user_id'],
-            comment_type=comment_type  # 修改为 comment_type
+            comment_type='comment'
         )
         
         db.session.add(new_comment)
@@ -453,37 +482,44 @@ def add_comment(doc_id):
         return redirect(url_for('view_document', doc_id=doc_id))
     except Exception as e:
         db.session.rollback()
+        idempotency.discard()
         print(f"添加评论错误: {str(e)}")
         flash('添加评论时出错', 'danger')
         return redirect(url_for('view_document', doc_id=doc_id))
 
 @app.route('/get_comments/<int:doc_id>')
+@read_only
+@limit_queries(2)
+@conditional(comments_version)
 def get_comments(doc_id):
-    """获取文档评论（JSON格式）"""
+    """获取文档评论（JSON格式），按时间倒序，通过 cursor 翻页"""
     try:
-        comments = Comment.query.filter_by(document_id=doc_id).order_by(Comment.created_at.desc()).all()
+        limit = min(max(request.args.get('limit', history.COMMENT_PAGE_SIZE, type=int), 1), 100)
+        comments, next_cursor = history.comments_page(doc_id, request.args.get('cursor'), limit)
         
-        comments_data = []
-        for comment in comments:
-            comments_data.append({
+        return jsonify({
+            'items': [{
                 'id': comment.id,
                 'content': comment.content,
-                'username': comment.user.username,
-                'comment_type': comment.comment_type,  # 修改为 comment_type
+                'username': comment.username,
+                'comment_type': comment.comment_type,
                 'created_at': comment.created_at.strftime('%Y-%m-%d %H:%M'),
-                'avatar': f"https://ui-avatars.com/api/?name={comment.user.username}&background=random"
-            })
-        
-        return jsonify(comments_data)
+                'avatar': f"https://ui-avatars.com/api/?name={comment.username}&background=random"
+            } for comment in comments],
+            'next_cursor': next_cursor
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"获取评论错误: {str(e)}")
         return jsonify({'error': '获取评论失败'}), 500
 
 @app.route('/admin/documents')
+@limit_queries(1)
 def admin_documents_list():
     """管理后台 - 文档审核"""
     try:
-        pending_docs = Document.query.filter_by(status='pending').all()
+        pending_docs = Document.query.options(db.joinedload(Document.author)).filter_by(status='pending').all()
         return render_template('admin_documents.html', documents=pending_docs)
     except Exception as e:
         print(f"审核列表错误: {str(e)}")
@@ -495,7 +531,6 @@ def approve_document(doc_id):
     """批准文档并奖励作者"""
     try:
         doc = Document.query.get_or_404(doc_id)
-        author = User.query.get(doc.author_id)
         stats = SystemStats.query.first()
         
         # 根据文档质量确定奖励（这里简化处理）
@@ -504,28 +539,24 @@ def approve_document(doc_id):
         
         if reward > stats.total_fees_collected:
             # 如果手续费池不足，使用系统创建积分
-            author.points += reward
             stats.total_points_created += reward
             source = "系统创建"
+            source_account = SYSTEM_ISSUANCE
         else:
             # 使用手续费池奖励
-            author.points += reward
             stats.total_fees_collected -= reward
             stats.total_rewards_given += reward
             source = "手续费池"
+            source_account = FEE_POOL
         
-        # 记录交易
-        reward_transaction = Transaction(
-            user_id=author.id,
-            document_id=doc.id,
-            amount=reward,
-            transaction_type='reward',
-            description=f'文档审核奖励 ({source})'
-        )
+        # 记账
+        ledger.post([
+            Leg(source_account, -reward, 'reward'),
+            Leg(user_account(doc.author_id), reward, 'reward'),
+        ], document_id=doc.id, description=f'文档审核奖励 ({source})')
         
         doc.status = 'approved'
         
-        db.session.add(reward_transaction)
         db.session.commit()
         
         flash(f'文档已批准，作者获得{reward}分奖励（来源: {source}）', 'success')
@@ -552,18 +583,14 @@ def reject_document(doc_id):
         return redirect(url_for('admin_documents_list'))
 
 @app.route('/system_stats')
+@read_only
+@limit_queries(1)
 def system_stats():
-    """系统统计页面"""
+    """系统统计页面（读取定时任务生成的统计快照）"""
     try:
-        stats = SystemStats.query.first()
-        users = User.query.count()
-        documents = Document.query.filter_by(status='approved').count()
-        
-        # 计算积分流通情况
-        total_points_in_circulation = db.session.query(db.func.sum(User.points)).scalar() or 0
+        stats = get_snapshot()
         points_created = stats.total_points_created
         fees_collected = stats.total_fees_collected
-        rewards_given = stats.total_rewards_given
         
         # 计算系统依赖度
         if points_created > 0:
@@ -573,9 +600,10 @@ def system_stats():
         
         return render_template('system_stats.html', 
                               stats=stats,
-                              users=users,
-                              documents=documents,
-                              total_points=total_points_in_circulation,
+                              users=stats.users,
+                              documents=stats.approved_documents,
+                              total_points=stats.points_in_circulation,
+                              snapshot_age=snapshot_age_seconds(stats),
                               system_dependency=f"{system_dependency:.2f}%")
     except Exception as e:
         print(f"系统统计错误: {str(e)}")
@@ -583,6 +611,7 @@ def system_stats():
         return redirect(url_for('home'))
 
 @app.route('/admin')
+@limit_queries(2)
 def admin_dashboard():
     """管理员仪表盘"""
     try:
@@ -596,34 +625,112 @@ def admin_dashboard():
         flash('加载管理员仪表盘时出错', 'danger')
         return redirect(url_for('home'))
 
+@app.route('/admin/export/<dataset>.<fmt>')
+def admin_export(dataset, fmt):
+    """管理员下载数据导出（CSV / JSONL），按块流式输出，?start=&end= 按创建日期过滤"""
+    if session.get('username') != 'admin':
+        return jsonify({'error': '无权限'}), 403
+    if dataset not in export.DATASETS or fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': '不支持的导出类型'}), 404
+    try:
+        start = export.parse_date(request.args.get('start'))
+        end = export.parse_date(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': '日期格式应为 YYYY-MM-DD'}), 400
+    response = Response(stream_with_context(export.stream(dataset, fmt, start, end)),
+                        mimetype=export.FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={dataset}.{fmt}'
+    return response
+
 # ========== 新增功能路由 ==========
 
-# 系统状态检查API
-@app.route('/api/system_status')
-def system_status():
-    """检查系统状态"""
+# 用户收支明细API（游标分页）
+@app.route('/api/transactions')
+@limit_queries(1)
+def transaction_history():
+    """当前用户的收支明细，按时间倒序，通过 cursor 翻页"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': '请先登录'}), 401
+    
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        transactions, next_cursor = history.transactions_page(
+            session['user_id'], request.args.get('cursor'), limit)
+        
+        return jsonify({
+            'items': [{
+                'id': t.id,
+                'document_id': t.document_id,
+                'amount': t.amount,
+                'transaction_type': t.transaction_type,
+                'description': t.description,
+                'created_at': t.created_at.strftime('%Y-%m-%d %H:%M')
+            } for t in transactions],
+            'next_cursor': next_cursor
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"收支明细错误: {str(e)}")
+        return jsonify({'success': False, 'error': '获取收支明细失败'}), 500
+
+# 用户月度收支汇总API
+@app.route('/api/transactions/monthly')
+@limit_queries(2)
+@conditional(transactions_version)
+def transaction_monthly():
+    """当前用户最近几个月的收入、支出、手续费和奖励（读预计算的汇总行）"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': '请先登录'}), 401
+    
     try:
-        # 简单检查数据库连接
-        db.session.execute('SELECT 1')
-        return jsonify({'status': 'good'})
+        months = min(max(request.args.get('months', 12, type=int), 1), 60)
+        rollups = history.monthly_rollups(session['user_id'], months)
+        return jsonify([{
+            'month': r.month,
+            'income': r.income,
+            'spend': r.spend,
+            'fees': r.fees,
+            'rewards': r.rewards
+        } for r in rollups])
     except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        print(f"月度汇总错误: {str(e)}")
+        return jsonify({'success': False, 'error': '获取月度汇总失败'}), 500
+
+# 社区动态翻页API
+@app.route('/api/community_posts')
+def community_posts_page():
+    """更早的社区动态，before 为上一页最后一条的 id"""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    posts, next_before = timeline.older_posts(request.args.get('before', type=int), limit)
+    return jsonify({
+        'items': [{
+            'id': p.id,
+            'content': p.content,
+            'username': p.username,
+            'created_at': p.created_at.strftime('%Y-%m-%d %H:%M')
+        } for p in posts],
+        'next_before': next_before
+    })
 
 # 平台文档列表
 @app.route('/platform_docs')
+@read_only
+@limit_queries(1)
 def platform_docs():
     """平台文档列表（排除当前用户自己的文档）"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
+    sort = request.args.get('sort')
     try:
         # 获取已批准的非当前用户文档
-        docs = Document.query.filter(
+        docs = Document.query.options(db.joinedload(Document.author)).filter(
             Document.status == 'approved',
             Document.author_id != session['user_id']
-        ).all()
+        ).order_by(*document_order(sort)).all()
         
-        return render_template('platform_docs.html', documents=docs)
+        return render_template('platform_docs.html', documents=docs, sort=sort)
     except Exception as e:
         print(f"平台文档列表错误: {str(e)}")
         flash('加载平台文档时出错', 'danger')
@@ -631,6 +738,8 @@ def platform_docs():
 
 # 需求列表
 @app.route('/demands')
+@read_only
+@limit_queries(3)
 def demand_list():
     """需求列表页面"""
     if 'user_id' not in session:
@@ -638,7 +747,7 @@ def demand_list():
     
     try:
         # 获取所有活跃需求
-        demands = Demand.query.filter_by(status='active').all()
+        demands = Demand.query.options(db.joinedload(Demand.user)).filter_by(status='active').all()
         
         # 计算需求统计
         service_demands = Demand.query.filter_by(
@@ -662,13 +771,15 @@ def demand_list():
 
 # 需求详情
 @app.route('/demand_detail/<int:demand_id>')
+@read_only
+@limit_queries(1)
 def demand_detail(demand_id):
     """需求详情页面"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
     try:
-        demand = Demand.query.get_or_404(demand_id)
+        demand = Demand.query.options(db.joinedload(Demand.user)).get_or_404(demand_id)
         return render_template('demand_detail.html', demand=demand)
     except Exception as e:
         print(f"需求详情错误: {str(e)}")
@@ -730,6 +841,7 @@ def submit_demand():
 
 # 在 app.py 中添加后端路由
 @app.route('/add_community_post', methods=['POST'])
+@idempotent
 def add_community_post():
     if 'user_id' not in session:
         return jsonify({'success': False, 'error': '请先登录'}), 401
@@ -745,21 +857,10 @@ def add_community_post():
             user_id=session['user_id']
         )
         db.session.add(new_post)
-        
-        # 检查内容中是否包含"需求"或"求购"，如果包含则创建需求
-        if "需求" in content or "求购" in content:
-            # 创建需求
-            new_demand = Demand(
-                title=f"来自社区的需求-{datetime.utcnow().strftime('%H%M%S')}",
-                description=content,
-                demand_type='service',  # 默认服务类型
-                points_required=100,   # 默认100积分
-                user_id=session['user_id'],
-                contact_info=User.query.get(session['user_id']).username  # 暂时用用户名作为联系方式
-            )
-            db.session.add(new_demand)
-        
         db.session.commit()
+        timeline.push(new_post, session['username'])
+        # 需求识别等分类处理在后台线程中进行
+        classify.enqueue(app, new_post.id)
         
         return jsonify({
             'success': True,
@@ -0,0 +1,105 @@
+"""冷数据归档
+
+交易和评论只增不减，按文档、按用户的查询和购买权限检查扫描的行数随时间增长。
+定时任务（tasks.py）每 ARCHIVE_INTERVAL_SECONDS 秒把较早的行移到结构相同的归档表，保持热表较小：
+
+- 交易：早于 TRANSACTION_ARCHIVE_DAYS 天的移到 transaction_archive
+- 评论：早于 COMMENT_ARCHIVE_DAYS 天的评论移到 comment_archive（点赞/差评在 reaction 表中，每人每篇一条，不归档）
+- 每批 ARCHIVE_BATCH_SIZE 行，复制和删除在同一个事务中，批与批之间暂停 ARCHIVE_BATCH_PAUSE 秒让出写锁；
+  中断后下次从剩余的行继续，不会重复或丢失
+- 原表中 id 最大的一行不归档：SQLite 在表中最大 id 被删除后会复用 id，归档表中的 id 会与新行冲突
+
+读取历史时用 union() 把两张表合并成一个查询（收支明细、评论列表和计数、购买权限检查见 history.py，
+共同购买见 related.py，数据导出见 export.py），调用方不需要关心行在哪张表。热度分数（ranking.py）中早于保留期的购买权重已衰减到可以忽略，只读原表。
+
+手动执行：python archive.py [--days N] [--batch-size N]
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from models import db, Transaction, TransactionArchive, Comment, CommentArchive
+
+TRANSACTION_ARCHIVE_DAYS = int(os.environ.get('TRANSACTION_ARCHIVE_DAYS', 365))
+COMMENT_ARCHIVE_DAYS = int(os.environ.get('COMMENT_ARCHIVE_DAYS', 180))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 2000))
+ARCHIVE_BATCH_PAUSE = float(os.environ.get('ARCHIVE_BATCH_PAUSE', 0.05))
+
+# 名称 -> (原表模型, 归档表模型, 保留天数, 额外的归档条件，为 table -> 条件表达式的函数)
+ARCHIVES = {
+    'transaction': (Transaction, TransactionArchive, TRANSACTION_ARCHIVE_DAYS, None),
+    'comment': (Comment, CommentArchive, COMMENT_ARCHIVE_DAYS, None),
+}
+
+
+def tables(name):
+    """[原表, 归档表]"""
+    model, archive_model, _, _ = ARCHIVES[name]
+    return [model.__table__, archive_model.__table__]
+
+
+def union(name, build):
+    """原表和归档表的 UNION ALL 子查询
+
+    build(table) 返回对单张表的 select，两张表各调用一次，各自带上过滤、排序和 LIMIT，
+    这样每张表都走自己的索引，外层只需合并少量行。
+    """
+    return db.union_all(*[build(table).alias().select() for table in tables(name)]).alias()
+
+
+def archive_batch(name, cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """把一批早于 cutoff 的行移到归档表，返回移动的行数"""
+    model, archive_model, _, condition = ARCHIVES[name]
+    table, archive_table = model.__table__, archive_model.__table__
+    max_id = db.session.execute(db.select([db.func.max(table.c.id)])).scalar()
+    if max_id is None:
+        return 0
+    due = db.and_(table.c.created_at < cutoff, table.c.id < max_id)
+    if condition is not None:
+        due = db.and_(due, condition(table))
+    # 本批最后一行的 id，按 id 范围复制和删除，不需要把每个 id 作为参数传入
+    batch = db.select([table.c.id]).where(due).order_by(table.c.id).limit(batch_size).alias()
+    last_id = db.session.execute(db.select([db.func.max(batch.c.id)])).scalar()
+    if last_id is None:
+        return 0
+    selected = db.and_(due, table.c.id <= last_id)
+    columns = [column.name for column in table.columns]
+    db.session.execute(archive_table.insert().from_select(
+        columns + ['archived_at'],
+        db.select([table.c[c] for c in columns] + [db.literal(datetime.utcnow(), db.DateTime)]).where(selected)))
+    moved = db.session.execute(table.delete().where(selected)).rowcount
+    db.session.commit()
+    return moved
+
+
+def run(days=None, batch_size=ARCHIVE_BATCH_SIZE, log=None):
+    """归档全部到期的行，返回 {名称: 移动行数}；days 覆盖各表的保留天数"""
+    moved = {}
+    for name, (_, _, keep_days, _) in ARCHIVES.items():
+        cutoff = datetime.utcnow() - timedelta(days=keep_days if days is None else days)
+        moved[name] = 0
+        while True:
+            count = archive_batch(name, cutoff, batch_size)
+            moved[name] += count
+            if count < batch_size:
+                break
+            if log:
+                log(f"{name}: 已归档 {moved[name]} 行")
+            time.sleep(ARCHIVE_BATCH_PAUSE)
+    return moved
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description='归档较早的交易和评论')
+    parser.add_argument('--days', type=int, help='保留最近多少天（默认按各表的设置）')
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        moved = run(args.days, args.batch_size, log=print)
+        print(f"归档完成：{moved}，用时 {time.perf_counter() - started:.1f}s")
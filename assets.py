@@ -0,0 +1,216 @@
+"""模板编译缓存和静态资源
+
+- Jinja 模板编译后的字节码缓存在 TEMPLATE_CACHE_DIR（默认 .jinja_cache/），
+  新启动的 worker 直接加载字节码，不用重新解析模板
+- 页面自己的 CSS/JS 按 BUNDLES 合并、压缩，文件名带内容哈希，
+  并预先生成 .gz / .br 版本，输出到 dist/，由 /assets/ 按 Accept-Encoding 直接返回压缩文件
+- 文件名随内容变化，/assets/ 下的响应都设置一年的强缓存
+
+构建/部署时执行一次，生成 dist/ 和模板缓存：
+
+    python assets.py
+
+没有执行构建时（开发环境），asset_url() 首次使用某个 bundle 时会现场构建；
+调试模式下每次都重新构建，修改源文件后刷新页面即可生效。
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from flask import request, send_from_directory
+from jinja2 import FileSystemBytecodeCache
+
+try:
+    import brotli
+except ImportError:  # 没有安装 Brotli 时只生成 gzip 版本
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(BASE_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+# 输出文件名 -> static/ 下按顺序合并的源文件
+BUNDLES = {
+    'index.css': ['css/index.css'],
+    'index.js': ['js/index.js'],
+    'dashboard.css': ['css/dashboard.css'],
+    'dashboard.js': ['js/dashboard.js'],
+    'document_detail.css': ['css/document_detail.css'],
+}
+
+# 预压缩后缀，按优先级排列：(Accept-Encoding 值, 文件后缀)
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+MIMETYPES = {'.css': 'text/css', '.js': 'application/javascript'}
+
+_asset_hashes = {}
+_manifest = None
+
+
+def template_cache_dir():
+    return os.environ.get('TEMPLATE_CACHE_DIR', os.path.join(BASE_DIR, '.jinja_cache'))
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()[:10]
+
+
+# ========== 压缩 ==========
+
+def minify_css(source):
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    """保守压缩：去掉缩进、空行和整行注释，保留换行以免影响自动分号插入"""
+    lines = []
+    for line in source.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+# ========== 构建 ==========
+
+def _load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, encoding='utf-8') as f:
+                _manifest = json.load(f)
+        except FileNotFoundError:
+            _manifest = {}
+    return _manifest
+
+
+def _write_manifest(manifest):
+    os.makedirs(DIST_DIR, exist_ok=True)
+    tmp_path = MANIFEST_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def build_bundle(name):
+    """合并、压缩一个 bundle，写出带哈希的文件及其 .gz/.br，返回输出文件名"""
+    stem, ext = os.path.splitext(name)
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(STATIC_DIR, source), encoding='utf-8') as f:
+            parts.append(MINIFIERS[ext](f.read()))
+    data = '\n'.join(parts).encode('utf-8')
+    output = f'{stem}.{hashlib.md5(data).hexdigest()[:10]}{ext}'
+
+    os.makedirs(DIST_DIR, exist_ok=True)
+    path = os.path.join(DIST_DIR, output)
+    if not os.path.exists(path):
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+        # 原始文件最后写入，存在即说明压缩版本已就绪
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    _load_manifest()[name] = output
+    return output
+
+
+def build_all():
+    """构建全部 bundle，重写 manifest 并删除不再引用的旧文件"""
+    global _manifest
+    _manifest = {}
+    for name in BUNDLES:
+        build_bundle(name)
+    _write_manifest(_manifest)
+    current = set(_manifest.values())
+    for filename in os.listdir(DIST_DIR):
+        base = re.sub(r'\.(gz|br)$', '', filename)
+        if filename != 'manifest.json' and base not in current:
+            os.remove(os.path.join(DIST_DIR, filename))
+    return dict(_manifest)
+
+
+def precompile_templates(app):
+    """加载全部 .html 模板，编译结果写入字节码缓存，返回模板数量"""
+    names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+# ========== 应用集成 ==========
+
+def init_app(app):
+    cache_dir = template_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    def asset_url(name):
+        """bundle 返回 /assets/ 下带哈希的文件；其他 static/ 文件附带 ?v=内容哈希"""
+        if name in BUNDLES:
+            output = _load_manifest().get(name)
+            if app.debug or output is None:
+                output = build_bundle(name)
+            return f'/assets/{output}'
+        if app.debug or name not in _asset_hashes:
+            _asset_hashes[name] = _file_hash(os.path.join(app.static_folder, name))
+        return f"{app.static_url_path}/{name}?v={_asset_hashes[name]}"
+
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.route('/assets/<path:filename>')
+    def asset(filename):
+        """返回构建好的资源，客户端支持时直接发送预压缩版本"""
+        mimetype = MIMETYPES.get(os.path.splitext(filename)[1])
+        for encoding, suffix in ENCODINGS:
+            if encoding in request.accept_encodings and os.path.exists(os.path.join(DIST_DIR, filename + suffix)):
+                response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype)
+                response.content_encoding = encoding
+                response.headers.pop('Content-Disposition', None)
+                break
+        else:
+            response = send_from_directory(DIST_DIR, filename, mimetype=mimetype)
+        response.vary.add('Accept-Encoding')
+        _set_immutable(response)
+        return response
+
+    @app.after_request
+    def cache_static_assets(response):
+        if request.endpoint == 'static' and request.args.get('v') and response.status_code == 200:
+            _set_immutable(response)
+        return response
+
+
+def _set_immutable(response):
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_MAX_AGE
+    response.cache_control.immutable = True
+
+
+if __name__ == '__main__':
+    from app import app
+
+    for name, output in build_all().items():
+        size = os.path.getsize(os.path.join(DIST_DIR, output))
+        gz_size = os.path.getsize(os.path.join(DIST_DIR, output + '.gz'))
+        print(f"{name:<22} -> {output:<32} {size:>7} 字节  gzip {gz_size:>6}")
+    if brotli is None:
+        print('未安装 Brotli，跳过 .br 文件')
+    count = precompile_templates(app)
+    print(f"已预编译 {count} 个模板到 {template_cache_dir()}")
@@ -0,0 +1,264 @@
+"""只读 JSON 接口的异步版本（Quart + aiosqlite）
+
+读多写少的公开接口在这里用异步方式实现，数据库等待期间不占用 worker，
+适合大量并发轮询（评论刷新、状态检查、列表翻页）。与 app.py 使用同一个数据库，单独部署：
+
+    hypercorn async_app:app --bind 0.0.0.0:5002
+
+由反向代理把下列路径转发到这里，其余请求仍由 app.py 处理：
+
+- GET /get_comments/<doc_id>     与 app.py 返回相同的 JSON，?cursor=<游标>&limit=20 翻页
+- GET /api/system_status         后台协程定时探测数据库，接口只读缓存
+- GET /api/documents             已审核文档列表，?before=<id>&limit=20 翻页
+- GET /api/community_posts       社区动态（与首页相同按发布时间排序），?before=<id>&limit=20 翻页
+- GET /api/demands               进行中的需求，?limit=20
+
+Quart 依赖 Flask 3，而 models.py 使用的 Flask-SQLAlchemy 2.x 无法在 Flask 3 下导入，
+所以这里不导入 models.py，直接写 SQL；表结构以 migrations/ 为准，修改表结构时需同步检查这里的查询。
+"""
+import asyncio
+import base64
+import binascii
+import os
+import time
+from datetime import datetime
+
+import aiosqlite
+from quart import Quart, jsonify, request
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///forklift.db')
+POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 4))
+HEALTH_CHECK_SECONDS = int(os.environ.get('HEALTH_CHECK_SECONDS', 15))
+MAX_PAGE_SIZE = 100
+COMMENT_PAGE_SIZE = 20
+CURSOR_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+SQLITE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'  # SQLAlchemy 写入 DateTime 的格式
+
+app = Quart(__name__)
+
+
+def database_path(url):
+    """sqlite:///相对路径 按项目目录解析，与 Flask-SQLAlchemy 的处理一致"""
+    if not url.startswith('sqlite:///'):
+        raise ValueError(f'异步接口只支持 SQLite: {url}')
+    path = url[len('sqlite:///'):]
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+class ConnectionPool:
+    """固定数量的 aiosqlite 连接，每个连接各自在一个后台线程中执行查询"""
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._queue = asyncio.Queue()
+
+    async def open(self):
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(self.path)
+            conn.row_factory = aiosqlite.Row
+            await conn.execute('PRAGMA query_only = ON')
+            self._queue.put_nowait(conn)
+
+    async def close(self):
+        while not self._queue.empty():
+            await self._queue.get_nowait().close()
+
+    async def fetchall(self, sql, params=()):
+        conn = await self._queue.get()
+        try:
+            async with conn.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+        finally:
+            self._queue.put_nowait(conn)
+
+    def checked_out(self):
+        return self.size - self._queue.qsize()
+
+
+pool = None
+_health = None
+
+
+def format_time(value):
+    """SQLite 中的时间字符串 -> 'YYYY-MM-DD HH:MM'，与同步接口一致"""
+    return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M') if value else None
+
+
+def encode_cursor(row):
+    """与 history.encode_cursor 相同的游标格式：base64('时间|id')"""
+    created_at = datetime.fromisoformat(row['created_at']).strftime(CURSOR_TIME_FORMAT)
+    return base64.urlsafe_b64encode(f"{created_at}|{row['id']}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """游标 -> (SQLite 中的时间字符串, id)；没有游标时返回排在所有行之后的位置"""
+    if not cursor:
+        return '9999-12-31 23:59:59.999999', 2 ** 62
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.strptime(created_at, CURSOR_TIME_FORMAT).strftime(SQLITE_TIME_FORMAT), int(row_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f'无效的游标: {cursor}') from e
+
+
+def page_args():
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_PAGE_SIZE)
+    before = request.args.get('before', type=int)
+    return before, limit
+
+
+def next_before(rows, limit):
+    return rows[-1]['id'] if len(rows) == limit else None
+
+
+async def probe():
+    started = time.perf_counter()
+    database = {'ok': True}
+    try:
+        await pool.fetchall('SELECT 1')
+    except Exception as e:
+        database = {'ok': False, 'error': str(e)}
+    database['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return {
+        'status': 'good' if database['ok'] else 'error',
+        'checked_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        'checked_monotonic': time.monotonic(),
+        'database': database,
+        'pool': {'class': 'aiosqlite', 'size': pool.size, 'checked_out': pool.checked_out()},
+    }
+
+
+async def health_loop():
+    global _health
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_SECONDS)
+        try:
+            _health = await probe()
+        except Exception as e:
+            app.logger.error(f"健康检查出错: {str(e)}")
+
+
+@app.before_serving
+async def startup():
+    global pool, _health
+    pool = ConnectionPool(database_path(DATABASE_URL), POOL_SIZE)
+    await pool.open()
+    _health = await probe()
+    app.add_background_task(health_loop)
+
+
+@app.after_serving
+async def shutdown():
+    await pool.close()
+
+
+# ========== 路由定义 ==========
+
+@app.route('/get_comments/<int:doc_id>')
+async def get_comments(doc_id):
+    """获取文档评论（JSON格式，含已归档的评论），按时间倒序，?cursor= 翻页，与 history.comments_page 一致"""
+    limit = min(max(request.args.get('limit', COMMENT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    try:
+        created_at, comment_id = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        # 评论表和归档表各走 (document_id, created_at, id) 索引取 limit + 1 行，合并后联查用户名
+        page = """
+            SELECT * FROM (
+                SELECT id, content, user_id, comment_type, created_at FROM {table}
+                WHERE document_id = ? AND (created_at < ? OR (created_at = ? AND id < ?))
+                ORDER BY created_at DESC, id DESC LIMIT ?)"""
+        params = (doc_id, created_at, created_at, comment_id, limit + 1)
+        rows = await pool.fetchall(f"""
+            SELECT c.id, c.content, c.comment_type, c.created_at, u.username
+            FROM ({page.format(table='comment')} UNION ALL {page.format(table='comment_archive')}) c
+            JOIN user u ON u.id = c.user_id
+            ORDER BY c.created_at DESC, c.id DESC LIMIT ?""", params + params + (limit + 1,))
+        return jsonify({
+            'items': [{
+                'id': row['id'],
+                'content': row['content'],
+                'username': row['username'],
+                'comment_type': row['comment_type'],
+                'created_at': format_time(row['created_at']),
+                'avatar': f"https://ui-avatars.com/api/?name={row['username']}&background=random"
+            } for row in rows[:limit]],
+            'next_cursor': encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        })
+    except Exception as e:
+        app.logger.error(f"获取评论错误: {str(e)}")
+        return jsonify({'error': '获取评论失败'}), 500
+
+
+@app.route('/api/system_status')
+async def system_status():
+    """检查系统状态（读取后台探测的缓存结果）"""
+    result = dict(_health)
+    result['age_seconds'] = round(time.monotonic() - result.pop('checked_monotonic'), 1)
+    return jsonify(result), 503 if result['status'] == 'error' else 200
+
+
+@app.route('/api/documents')
+async def list_documents():
+    """已审核文档，按 id 倒序翻页"""
+    before, limit = page_args()
+    rows = await pool.fetchall("""
+        SELECT d.id, d.title, d.price, d.read_count, d.created_at, u.username AS author
+        FROM document d JOIN user u ON u.id = d.author_id
+        WHERE d.status = 'approved' AND d.id < ?
+        ORDER BY d.id DESC LIMIT ?""", (before or 2 ** 62, limit))
+    return jsonify({
+        'items': [{
+            'id': row['id'],
+            'title': row['title'],
+            'price': row['price'],
+            'read_count': row['read_count'],
+            'author': row['author'],
+            'created_at': format_time(row['created_at'])
+        } for row in rows],
+        'next_before': next_before(rows, limit)
+    })
+
+
+@app.route('/api/community_posts')
+async def list_community_posts():
+    """社区动态，按发布时间倒序翻页，before 为上一页最后一条的 id"""
+    before, limit = page_args()
+    rows = await pool.fetchall("""
+        SELECT p.id, p.content, p.created_at, u.username
+        FROM community_post p JOIN user u ON u.id = p.user_id
+        WHERE ? IS NULL OR (p.created_at, p.id) < (SELECT created_at, id FROM community_post WHERE id = ?)
+        ORDER BY p.created_at DESC, p.id DESC LIMIT ?""", (before, before, limit))
+    return jsonify({
+        'items': [{
+            'id': row['id'],
+            'content': row['content'],
+            'username': row['username'],
+            'created_at': format_time(row['created_at'])
+        } for row in rows],
+        'next_before': next_before(rows, limit)
+    })
+
+
+@app.route('/api/demands')
+async def list_demands():
+    """进行中的需求，按发布时间倒序"""
+    _, limit = page_args()
+    rows = await pool.fetchall("""
+        SELECT id, title, demand_type, points_required, created_at
+        FROM demand WHERE status = 'active'
+        ORDER BY created_at DESC LIMIT ?""", (limit,))
+    return jsonify([{
+        'id': row['id'],
+        'title': row['title'],
+        'demand_type': row['demand_type'],
+        'points_required': row['points_required'],
+        'created_at': format_time(row['created_at'])
+    } for row in rows])
+
+
+if __name__ == '__main__':
+    app.run(port=5002)
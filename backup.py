@@ -0,0 +1,198 @@
+"""数据库在线备份
+
+应用运行时直接复制 forklift.db 可能得到写了一半的文件。这里用 SQLite 的在线备份接口，
+得到某一时刻的一致快照，由定时任务（tasks.py）每 BACKUP_INTERVAL_SECONDS 秒执行一次：
+
+- 每步复制 BACKUP_PAGES_PER_STEP 页，步与步之间暂停 BACKUP_STEP_PAUSE 秒，让出锁给写入；
+  备份期间其他连接写入时 SQLite 会从头重新复制，超过 BACKUP_YIELD_SECONDS 仍未完成时改为一步复制完
+- 快照先写到临时文件并做 PRAGMA integrity_check，通过后用 gzip 压缩为
+  BACKUP_DIR/forklift-<UTC 时间>.db.gz，只保留最新的 BACKUP_KEEP 份
+- 每次备份后把压缩文件解压到临时目录再做一次完整性检查（恢复演练），确认备份可用
+
+手动执行：
+
+    python backup.py                          # 立即备份
+    python backup.py --verify backups/xxx.db.gz
+    python backup.py --restore backups/xxx.db.gz --to /path/restored.db
+
+恢复时先停止应用，再用 --restore 解压出的文件替换数据库文件。
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from models import db
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKUP_DIR = os.environ.get('BACKUP_DIR', os.path.join(BASE_DIR, 'backups'))
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 7))
+BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', 256))
+BACKUP_STEP_PAUSE = float(os.environ.get('BACKUP_STEP_PAUSE', 0.01))
+BACKUP_YIELD_SECONDS = float(os.environ.get('BACKUP_YIELD_SECONDS', 60))
+PREFIX = 'forklift-'
+SUFFIX = '.db.gz'
+
+
+class BackupError(RuntimeError):
+    pass
+
+
+def database_path():
+    """当前应用使用的 SQLite 文件路径（需要在应用上下文中调用）"""
+    url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        raise BackupError(f'只支持 SQLite 文件数据库: {url}')
+    return url.database
+
+
+def integrity_check(path):
+    conn = sqlite3.connect(path)
+    try:
+        result = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+    finally:
+        conn.close()
+    if result != ['ok']:
+        raise BackupError(f'完整性检查失败: {path}: {"; ".join(result[:5])}')
+
+
+class _YieldTimeout(Exception):
+    pass
+
+
+def snapshot(source_path, target_path):
+    """用在线备份接口把 source 复制到 target，返回用时秒"""
+    started = time.monotonic()
+
+    def progress(status, remaining, total):
+        if not remaining:
+            return
+        if time.monotonic() - started >= BACKUP_YIELD_SECONDS:
+            raise _YieldTimeout()
+        time.sleep(BACKUP_STEP_PAUSE)
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=progress)
+        except _YieldTimeout:
+            # 写入频繁时分步复制会不断从头开始，改为一步复制完（期间写入短暂等待）
+            source.backup(target, pages=0)
+    finally:
+        target.close()
+        source.close()
+    return time.monotonic() - started
+
+
+def _compress(source_path, target_path):
+    partial = target_path + '.partial'
+    with open(source_path, 'rb') as src, gzip.open(partial, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(partial, target_path)
+
+
+def list_backups(directory=BACKUP_DIR):
+    """按时间从新到旧返回备份文件路径"""
+    if not os.path.isdir(directory):
+        return []
+    names = [n for n in os.listdir(directory) if n.startswith(PREFIX) and n.endswith(SUFFIX)]
+    return [os.path.join(directory, n) for n in sorted(names, reverse=True)]
+
+
+def rotate(directory=BACKUP_DIR, keep=BACKUP_KEEP):
+    """删除超出保留份数的旧备份，返回删除的文件"""
+    removed = list_backups(directory)[keep:]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def restore(archive, target_path):
+    """把备份解压到 target_path 并检查完整性（不会覆盖已存在的文件）"""
+    if os.path.exists(target_path):
+        raise BackupError(f'目标文件已存在: {target_path}')
+    partial = target_path + '.partial'
+    with gzip.open(archive, 'rb') as src, open(partial, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    try:
+        integrity_check(partial)
+    except BackupError:
+        os.remove(partial)
+        raise
+    os.replace(partial, target_path)
+
+
+def verify(archive):
+    """恢复演练：解压到临时目录并检查完整性，返回迁移版本号"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'restore.db')
+        restore(archive, path)
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0]
+        finally:
+            conn.close()
+
+
+def refresh_replica(replica_path):
+    """把主库快照整体替换为只读副本（副本为 SQLite 文件时使用），返回用时秒；需要在应用上下文中调用
+
+    先复制到同目录的临时文件再原子替换，正在副本上执行的查询读完旧文件，新查询读取新文件。
+    """
+    started = time.monotonic()
+    partial = replica_path + '.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+    snapshot(database_path(), partial)
+    conn = sqlite3.connect(partial)
+    try:
+        # 副本只读，不需要 WAL；避免替换后遗留的 -wal 文件与新文件不匹配
+        conn.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        conn.close()
+    os.replace(partial, replica_path)
+    return time.monotonic() - started
+
+
+def run_backup(directory=BACKUP_DIR, keep=BACKUP_KEEP):
+    """备份当前数据库，返回备份文件路径；需要在应用上下文中调用"""
+    source_path = database_path()
+    os.makedirs(directory, exist_ok=True)
+    archive = os.path.join(directory, f"{PREFIX}{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}{SUFFIX}")
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        copy = os.path.join(tmp, 'snapshot.db')
+        snapshot(source_path, copy)
+        integrity_check(copy)
+        _compress(copy, archive)
+    verify(archive)
+    rotate(directory, keep)
+    return archive
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='数据库在线备份')
+    parser.add_argument('--verify', metavar='ARCHIVE', help='检查备份文件能否恢复')
+    parser.add_argument('--restore', metavar='ARCHIVE', help='解压备份文件（需配合 --to）')
+    parser.add_argument('--to', help='恢复到的文件路径，不能已存在')
+    args = parser.parse_args()
+
+    if args.verify:
+        print(f"备份可用，迁移版本 {verify(args.verify)}")
+    elif args.restore:
+        if not args.to:
+            parser.error('--restore 需要 --to')
+        restore(args.restore, args.to)
+        print(f"已恢复到 {args.to}，停止应用后替换数据库文件即可")
+    else:
+        from app import app
+        with app.app_context():
+            started = time.perf_counter()
+            archive = run_backup()
+        print(f"已备份到 {archive}（{os.path.getsize(archive) / 1024 / 1024:.1f} MB，"
+              f"用时 {time.perf_counter() - started:.1f}s）")
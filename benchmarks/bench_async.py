@@ -0,0 +1,111 @@
+"""同步与异步只读接口的并发吞吐对比
+
+分别启动 app.py（waitress，固定线程数）和 async_app.py（hypercorn），
+用 N 个并发长连接反复请求同一接口，统计每秒请求数：
+
+    python benchmarks/bench_async.py --database sqlite:////tmp/bench.db --concurrency 1 16 64
+
+数据库需要事先用 migrate.py 和 gen_data.py 准备好。两个应用依赖的 Flask 版本不同时，
+可用 --sync-python / --async-python 指定各自虚拟环境中的解释器。
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from common import ROOT
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, path, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', path)
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'服务未能在 {timeout} 秒内启动 (端口 {port})')
+
+
+def start_server(kind, python, database, threads):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database)
+    if kind == 'sync':
+        command = [python, '-m', 'waitress', f'--threads={threads}', f'--listen=127.0.0.1:{port}', 'app:app']
+    else:
+        command = [python, '-m', 'hypercorn', '--bind', f'127.0.0.1:{port}', 'async_app:app']
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process, port
+
+
+def hammer(port, path, concurrency, seconds):
+    """concurrency 个线程各持一个长连接循环请求，返回 (请求数/秒, 错误数)"""
+    counts = [0] * concurrency
+    errors = [0] * concurrency
+    stop = time.perf_counter() + seconds
+
+    def worker(i):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        while time.perf_counter() < stop:
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    counts[i] += 1
+                else:
+                    errors[i] += 1
+            except (OSError, http.client.HTTPException):
+                errors[i] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        conn.close()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(counts) / (time.perf_counter() - started), sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='同步/异步接口并发吞吐对比')
+    parser.add_argument('--database', required=True, help='DATABASE_URL，例如 sqlite:////tmp/bench.db')
+    parser.add_argument('--paths', nargs='+', default=['/get_comments/1', '/api/system_status'])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=4, help='waitress 线程数')
+    parser.add_argument('--sync-python', default=sys.executable)
+    parser.add_argument('--async-python', default=sys.executable)
+    args = parser.parse_args()
+
+    print(f"{'应用':<8}{'接口':<24}{'并发':>6}{'请求/秒':>10}{'错误':>6}")
+    for kind, python in (('sync', args.sync_python), ('async', args.async_python)):
+        process, port = start_server(kind, python, args.database, args.threads)
+        try:
+            wait_ready(port, args.paths[0])
+            for path in args.paths:
+                for concurrency in args.concurrency:
+                    rps, errors = hammer(port, path, concurrency, args.seconds)
+                    print(f"{kind:<8}{path:<24}{concurrency:>6}{rps:>10.0f}{errors:>6}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""文档查重基准：LSH 候选查询与逐篇比较签名
+
+在临时数据库中生成 N 篇随机文档，其中一部分是对已有文档做少量改动得到的近似重复，
+先用 dedup.index_backlog() 批量建索引，再用一组查询文档比较：
+
+- lsh：dedup.find_duplicates()，只比较同桶的候选
+- scan：把全部签名读成矩阵后逐篇比较（不用索引时的做法）
+
+并以 scan 的结果为准统计 lsh 的召回率：
+
+    python benchmarks/bench_dedup.py --documents 100000 --queries 200
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from common import ROOT
+
+WORDS = ['叉车', '液压', '油缸', '密封圈', '更换', '检查', '电瓶', '充电', '门架', '链条', '调整', '润滑',
+         '制动', '刹车片', '转向', '轮胎', '故障', '报警', '控制器', '电机', '接触器', '保险丝', '拆卸',
+         '安装', '紧固', '螺栓', '扭矩', '步骤', '注意', '安全', '维修', '保养', '周期', '滤芯', '机油']
+
+
+def random_text(rng, words):
+    return ''.join(rng.choice(WORDS) for _ in range(words))
+
+
+def mutate(rng, text, ratio):
+    """随机替换约 ratio 比例的字符，模拟改头换面的重复提交"""
+    chars = list(text)
+    for i in rng.sample(range(len(chars)), int(len(chars) * ratio)):
+        chars[i] = rng.choice('的了和是在把将对')
+    return ''.join(chars)
+
+
+def populate(db, documents, duplicate_ratio, edit_ratio, words, rng):
+    db.session.execute("INSERT INTO user (username, password, points, created_at) VALUES ('bench', 'x', 0, :now)",
+                       {'now': datetime.utcnow()})
+    contents = []
+    for i in range(documents):
+        if contents and rng.random() < duplicate_ratio:
+            contents.append(mutate(rng, rng.choice(contents), edit_ratio))
+        else:
+            contents.append(random_text(rng, words))
+    rows = [{'title': f'文档{i}', 'content': c, 'price': 100, 'status': 'approved', 'author_id': 1,
+             'read_count': 0, 'created_at': datetime.utcnow()} for i, c in enumerate(contents)]
+    for start in range(0, len(rows), 10000):
+        db.session.execute(
+            'INSERT INTO document (title, content, price, status, author_id, read_count, created_at) '
+            'VALUES (:title, :content, :price, :status, :author_id, :read_count, :created_at)',
+            rows[start:start + 10000])
+    db.session.commit()
+    return contents
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文档查重基准')
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--words', type=int, default=120, help='每篇文档的词数')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.02)
+    parser.add_argument('--edit-ratio', type=float, default=0.01, help='近似重复文档改动的字符比例')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'dedup.db')}"
+        subprocess.run([sys.executable, 'migrate.py'], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        sys.path.insert(0, ROOT)
+        import numpy as np
+        import dedup
+        from app import app
+        from models import db, DocumentMinHash
+
+        with app.app_context():
+            started = time.perf_counter()
+            contents = populate(db, args.documents, args.duplicate_ratio, args.edit_ratio, args.words, rng)
+            print(f"生成 {args.documents} 篇文档: {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            indexed = dedup.index_backlog(batch_size=2000)
+            elapsed = time.perf_counter() - started
+            print(f"批量建索引 {indexed} 篇: {elapsed:.1f}s（{indexed / elapsed:.0f} 篇/秒）")
+
+            # 一半查询是已有文档的近似副本，一半是全新内容
+            queries = [mutate(rng, rng.choice(contents), args.edit_ratio) if i % 2 == 0 else random_text(rng, args.words)
+                       for i in range(args.queries)]
+            signatures = [dedup.signature(q) for q in queries]
+
+            started = time.perf_counter()
+            lsh_results = [{d for d, _ in dedup.find_duplicates(sig)} for sig in signatures]
+            lsh_ms = (time.perf_counter() - started) / len(queries) * 1000
+
+            started = time.perf_counter()
+            rows = db.session.query(DocumentMinHash.document_id, DocumentMinHash.signature).all()
+            ids = np.array([r[0] for r in rows])
+            matrix = np.vstack([np.frombuffer(r[1], dtype=np.uint32) for r in rows])
+            load_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            scan_results = [set(ids[(matrix == sig).mean(axis=1) >= dedup.DUPLICATE_THRESHOLD].tolist())
+                            for sig in signatures]
+            scan_ms = (time.perf_counter() - started) / len(queries) * 1000
+
+        expected = sum(len(s) for s in scan_results)
+        found = sum(len(l & s) for l, s in zip(lsh_results, scan_results))
+        print(f"lsh : {lsh_ms:8.2f} ms/查询")
+        print(f"scan: {scan_ms:8.2f} ms/查询（另需一次性读取全部签名 {load_ms:.0f} ms）")
+        print(f"疑似重复 {expected} 个，lsh 召回 {found}（{found / expected if expected else 1:.1%}）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""页面体积基准：首页、仪表盘、文档详情
+
+在临时数据库中生成少量数据，渲染页面后取出页面引用的本站 CSS/JS，
+分别按不压缩、gzip、br 请求，统计首次访问和再次访问（资源已被浏览器缓存）需要传输的字节数：
+
+    python assets.py                      # 先构建资源
+    python benchmarks/bench_page_weight.py
+
+CDN 上的 jQuery/Bootstrap/Font Awesome 不计入。
+"""
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT
+
+ASSET_PATTERN = re.compile(r'(?:href|src)="(/(?:assets|static)/[^"]+)"')
+
+
+def prepare_database(path):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}')
+    subprocess.run([sys.executable, 'migrate.py'], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, 'gen_data.py', '--users', '50', '--documents', '100', '--comments', '1000',
+                    '--purchases', '500', '--posts', '50', '--demands', '20'],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    return env['DATABASE_URL']
+
+
+def asset_bytes(client, url, encoding):
+    response = client.get(url, headers={'Accept-Encoding': encoding})
+    assert response.status_code == 200, (url, response.status_code)
+    return len(response.get_data())
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = prepare_database(os.path.join(tmp, 'weight.db'))
+        sys.path.insert(0, ROOT)
+        from app import app
+        from models import User, Document
+
+        app.config['TESTING'] = True
+        client = app.test_client()
+        with app.app_context():
+            doc = Document.query.filter_by(status='approved').first()
+            doc_id, author_id, author_name = doc.id, doc.author_id, doc.author.username
+        with client.session_transaction() as sess:
+            sess['user_id'] = author_id
+            sess['username'] = author_name
+
+        print(f"{'页面':<16}{'HTML':>8}{'资源':>6}{'原始':>9}{'gzip':>9}{'br':>9}{'再次访问':>10}")
+        for route in ['/', '/dashboard', f'/document/{doc_id}']:
+            response = client.get(route)
+            html = response.get_data(as_text=True)
+            html_bytes = len(response.get_data())
+            urls = ASSET_PATTERN.findall(html)
+            sizes = [sum(asset_bytes(client, url, encoding) for url in urls)
+                     for encoding in ('identity', 'gzip', 'br')]
+            print(f"{route:<16}{html_bytes:>8}{len(urls):>6}{sizes[0]:>9}{sizes[1]:>9}{sizes[2]:>9}{html_bytes:>10}")
+
+
+if __name__ == '__main__':
+    main()
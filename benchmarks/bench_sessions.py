@@ -0,0 +1,73 @@
+"""会话存储基准：签名 cookie 与服务端会话
+
+在临时数据库上以已登录状态重复请求 /healthz（视图本身不做 I/O），比较每个请求的会话开销：
+
+- cookie：Flask 默认的签名 cookie，每次请求都要校验签名、反序列化
+- sql：server_session 表，不使用进程内缓存（每次请求读一次表）
+- sql+cache：server_session 表 + 进程内 LRU 缓存
+
+    python benchmarks/bench_sessions.py --requests 5000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT
+
+
+def session_cookie_size(client):
+    if hasattr(client, 'get_cookie'):  # Werkzeug >= 2.3
+        cookie = client.get_cookie('session')
+        return len(cookie.value) if cookie is not None else None
+    for cookie in client.cookie_jar:
+        if cookie.name == 'session':
+            return len(cookie.value)
+    return None
+
+
+def run(app, interface, requests):
+    app.session_interface = interface
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['username'] = 'bench_user'
+        sess['recent_documents'] = list(range(50))  # 模拟会话中存放的其他数据
+    cookie_size = session_cookie_size(client)
+
+    client.get('/healthz')
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get('/healthz')
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, elapsed / requests * 1e6, cookie_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='会话存储基准')
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'sessions.db')}"
+        subprocess.run([sys.executable, 'migrate.py'], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        sys.path.insert(0, ROOT)
+        from flask.sessions import SecureCookieSessionInterface
+        from app import app
+        from sessions import ServerSessionInterface, SessionCache, SqlSessionStore
+
+        cases = [
+            ('cookie', SecureCookieSessionInterface()),
+            ('sql', ServerSessionInterface(SqlSessionStore(), SessionCache(size=0))),
+            ('sql+cache', ServerSessionInterface(SqlSessionStore(), SessionCache(ttl=3600))),
+        ]
+        print(f"{'存储':<12}{'请求/秒':>10}{'微秒/请求':>12}{'cookie字节':>12}")
+        for name, interface in cases:
+            rps, per_request, cookie_size = run(app, interface, args.requests)
+            print(f"{name:<12}{rps:>10.0f}{per_request:>12.1f}{cookie_size if cookie_size is not None else '-':>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""启动耗时基准测试
+
+在子进程中反复冷启动 `import app`，对比去掉启动时 create_all 前后的耗时：
+
+    python benchmarks/bench_startup.py --runs 20
+
+"legacy" 一栏在导入后额外执行原先启动时的 db.create_all() + SystemStats 检查，
+用于估算每个 worker 启动节省的时间。
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+from common import ROOT
+
+CURRENT = '''
+import time
+t = time.perf_counter()
+import app
+print(time.perf_counter() - t)
+'''
+
+LEGACY = '''
+import time
+t = time.perf_counter()
+import app
+from models import db, SystemStats
+with app.app.app_context():
+    db.create_all()
+    SystemStats.query.first()
+print(time.perf_counter() - t)
+'''
+
+
+def measure(code, runs):
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout
+        timings.append(float(out.strip().splitlines()[-1]) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:<8} 中位数 {statistics.median(timings):8.1f} ms  "
+          f"最小 {min(timings):8.1f} ms  最大 {max(timings):8.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='应用冷启动耗时')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+    report('current', measure(CURRENT, args.runs))
+    report('legacy', measure(LEGACY, args.runs))
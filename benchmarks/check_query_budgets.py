@@ -0,0 +1,76 @@
+"""检查各路由的 SQL 查询次数是否在预算内
+
+用 gen_data.py 在临时数据库中生成一批数据，登录后依次请求主要页面和 API，
+打开 QUERY_BUDGET_STRICT，任何路由超出 @limit_queries 声明的预算都会报错：
+
+    python benchmarks/check_query_budgets.py
+
+数据量越大，N+1 查询越明显；查询次数不应随数据量增长。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT
+
+
+def prepare_database(path, scale):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}')
+    subprocess.run([sys.executable, 'migrate.py'], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, 'gen_data.py',
+                    '--users', str(scale), '--documents', str(scale * 2), '--comments', str(scale * 20),
+                    '--purchases', str(scale * 10), '--posts', str(scale), '--demands', str(scale)],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    return env['DATABASE_URL']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='路由查询预算检查')
+    parser.add_argument('--scale', type=int, default=200, help='生成数据的基准规模（用户数）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = prepare_database(os.path.join(tmp, 'budget.db'), args.scale)
+        # 会话在整个检查过程中都命中进程内缓存，不计入各路由的查询次数
+        os.environ['SESSION_CACHE_SECONDS'] = '3600'
+        sys.path.insert(0, ROOT)
+        from app import app
+        from models import User, Document, Demand
+        from stats import refresh_snapshot
+
+        app.config['TESTING'] = True
+        app.config['QUERY_BUDGET_STRICT'] = True
+        client = app.test_client()
+
+        with app.app_context():
+            user = User.query.filter(User.username.like('gen_user_%')).order_by(User.id).first()
+            user_id, username = user.id, user.username
+            doc_id = Document.query.filter(Document.status == 'approved', Document.author_id != user_id).first().id
+            demand_id = Demand.query.first().id
+            # 统计快照由 tasks.py 定时生成，这里先生成一次
+            refresh_snapshot()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['username'] = username
+
+        routes = [
+            '/', '/?sort=hot', '/dashboard', f'/document/{doc_id}', f'/get_comments/{doc_id}',
+            '/platform_docs', '/platform_docs?sort=hot', '/demands', f'/demand_detail/{demand_id}',
+            '/admin/documents', '/admin', '/system_stats',
+            '/api/transactions', '/api/transactions/monthly',
+        ]
+        failed = False
+        for route in routes:
+            try:
+                response = client.get(route)
+                print(f"{route:<28} {response.status_code}  查询 {response.headers.get('X-Query-Count')} 次")
+            except AssertionError as e:
+                failed = True
+                print(f"{route:<28} 超出预算: {e}")
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""检查只读副本路由
+
+用两个本地 SQLite 文件（主库和副本）验证：
+
+- @read_only 页面的查询走副本，不访问主库
+- 写入走主库；写入后同一会话的只读页面改读主库（读己之写），其他会话仍读副本
+- backup.refresh_replica 同步后，其他会话也能读到新数据
+
+    python benchmarks/check_replica_routing.py
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import event
+
+from common import ROOT
+
+
+def prepare_database(path):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}')
+    subprocess.run([sys.executable, 'migrate.py'], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, 'gen_data.py', '--users', '20', '--documents', '40', '--comments', '200',
+                    '--purchases', '100', '--posts', '10', '--demands', '10'],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+class StatementLog:
+    """记录某个引擎上执行的 SQL（会话表除外，会话由 sessions.py 直接读写主库）"""
+
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if 'server_session' not in statement:
+            self.statements.append(statement)
+
+    def take(self):
+        statements, self.statements = self.statements, []
+        return statements
+
+
+def check(condition, message):
+    condition = bool(condition)
+    print(f"{'通过' if condition else '失败'}  {message}")
+    return condition
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        primary_path = os.path.join(tmp, 'primary.db')
+        replica_path = os.path.join(tmp, 'replica.db')
+        prepare_database(primary_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{primary_path}'
+        os.environ['REPLICA_DATABASE_URL'] = f'sqlite:///{replica_path}'
+        os.environ['SESSION_CACHE_SECONDS'] = '3600'
+        sys.path.insert(0, ROOT)
+        from app import app
+        from models import db, User, Document
+        import backup
+        import replicas
+
+        app.config['TESTING'] = True
+        ok = True
+        with app.app_context():
+            ok &= check(replicas.replica_path(app) == replica_path, '副本路径取自 REPLICA_DATABASE_URL')
+            backup.refresh_replica(replica_path)
+            primary = StatementLog(db.engine)
+            replica = StatementLog(db.get_engine(app, bind=replicas.REPLICA_BIND))
+            user = User.query.filter(User.username.like('gen_user_%')).order_by(User.id).first()
+            other = User.query.filter(User.username.like('gen_user_%'), User.id != user.id).first()
+            doc_id = Document.query.filter_by(status='approved').first().id
+            users = [(user.id, user.username), (other.id, other.username)]
+            primary.take()
+
+        writer, reader = app.test_client(), app.test_client()
+        for client, (user_id, username) in zip((writer, reader), users):
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+                sess['username'] = username
+
+        for route in ['/', '/platform_docs', '/demands', f'/get_comments/{doc_id}']:
+            response = reader.get(route)
+            ok &= check(response.status_code == 200 and replica.take() and not primary.take(),
+                        f'{route} 只读副本')
+
+        # 模拟复制延迟：只写主库
+        conn = sqlite3.connect(primary_path)
+        conn.execute("UPDATE document SET title = title || ' [主库]' WHERE id = ?", (doc_id,))
+        conn.commit()
+        conn.close()
+        ok &= check('[主库]' not in reader.get('/').get_data(as_text=True), '副本尚未同步时读到旧数据')
+
+        content = '副本路由检查评论'
+        response = writer.post(f'/add_comment/{doc_id}', data={'comment_type': 'comment', 'content': content})
+        writes = [s for s in primary.take() if s.lstrip().upper().startswith('INSERT')]
+        ok &= check(response.status_code == 302 and writes and not any(
+            s.lstrip().upper().startswith('INSERT') for s in replica.take()), '评论写入主库')
+
+        comments = writer.get(f'/get_comments/{doc_id}').get_json()['items']
+        ok &= check(any(c['content'] == content for c in comments) and primary.take(), '写入者随后读主库（读己之写）')
+        comments = reader.get(f'/get_comments/{doc_id}').get_json()['items']
+        ok &= check(not any(c['content'] == content for c in comments) and not primary.take(), '其他会话仍读副本')
+
+        with app.app_context():
+            backup.refresh_replica(replica_path)
+        replica.take()
+        comments = reader.get(f'/get_comments/{doc_id}').get_json()['items']
+        ok &= check(any(c['content'] == content for c in comments) and not primary.take(), '副本同步后其他会话读到新评论')
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+"""基准测试和检查脚本的公共设置
+
+各脚本用 `from common import ROOT` 取得项目根目录；导入时设置好环境变量，
+脚本中导入应用或启动的子进程（migrate.py、gen_data.py、waitress 等）都会继承：
+
+- SECRET_KEY：应用在未设置时拒绝启动，这里用一个仅供测试的值
+"""
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
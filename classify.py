@@ -0,0 +1,260 @@
+"""社区动态分类
+
+发布社区动态时只入队，由后台线程识别关键词并执行对应的处理（例如生成需求），不占用请求时间：
+
+- 关键词词典按类别配置，默认见 DEFAULT_KEYWORDS，可用 CLASSIFY_KEYWORDS_FILE 指向一个
+  {"类别": ["关键词", ...]} 的 JSON 文件替换
+- 所有关键词编译成一个 Aho-Corasick 自动机，一次扫描找出全部命中
+- 每个类别对应一个处理函数（register_handler），命中该类别的任意关键词时调用一次
+- 处理前用条件更新 classified_at 认领动态，后台线程和批量补处理不会重复处理同一条
+- 每条动态在自己的 savepoint 中处理，处理函数出错时只回滚这一条，错误记在 classify_error 上并照常标记为已分类，
+  不影响同批的其他动态；修复后把 classified_at 和 classify_error 置空即可重新处理
+
+进程退出时队列中未处理的动态保持 classified_at 为空，由 tasks.py 定时补处理，也可以手动执行：
+
+    python classify.py --batch-size 1000
+"""
+import json
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+import health
+from models import db, User, CommunityPost, Demand
+
+DEFAULT_KEYWORDS = {
+    'demand': ['需求', '求购'],
+}
+
+# 入队后超过这个时间仍未分类的动态才由定时任务补处理，避免与后台线程抢同一批
+SWEEP_DELAY = timedelta(seconds=60)
+ERROR_MAX_LENGTH = 200
+
+
+class AhoCorasick:
+    """多模式字符串匹配：find() 返回文本中出现的全部 (位置, 关键词)"""
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for keyword in keywords:
+            self._add(keyword)
+        self._build()
+
+    def _add(self, keyword):
+        state = 0
+        for char in keyword:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append(keyword)
+
+    def _build(self):
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, child in self._goto[state].items():
+                pending.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text):
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword in self._output[state]:
+                matches.append((position - len(keyword) + 1, keyword))
+        return matches
+
+
+def load_keywords():
+    path = os.environ.get('CLASSIFY_KEYWORDS_FILE')
+    if not path:
+        return DEFAULT_KEYWORDS
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class Classifier:
+    def __init__(self, keywords):
+        self.categories = {}
+        for category, words in keywords.items():
+            for word in words:
+                self.categories.setdefault(word, set()).add(category)
+        self.matcher = AhoCorasick(self.categories)
+
+    def classify(self, text):
+        """返回 {类别: [命中的关键词]}"""
+        result = {}
+        for _, keyword in self.matcher.find(text):
+            for category in self.categories[keyword]:
+                result.setdefault(category, [])
+                if keyword not in result[category]:
+                    result[category].append(keyword)
+        return result
+
+
+classifier = Classifier(load_keywords())
+
+_handlers = {}
+
+
+def register_handler(category, handler):
+    """handler(post, keywords) 在认领动态的同一事务中执行，post 含 id/content/user_id/username/created_at"""
+    _handlers[category] = handler
+
+
+def create_demand(post, keywords):
+    """包含需求关键词的动态生成一条需求"""
+    db.session.add(Demand(
+        title=f"来自社区的需求-{post.created_at.strftime('%H%M%S')}",
+        description=post.content,
+        demand_type='service',  # 默认服务类型
+        points_required=100,   # 默认100积分
+        user_id=post.user_id,
+        contact_info=post.username,  # 暂时用用户名作为联系方式
+        source_post_id=post.id
+    ))
+
+
+register_handler('demand', create_demand)
+
+
+# ========== 处理 ==========
+
+def _posts_query():
+    return db.session.query(CommunityPost.id, CommunityPost.content, CommunityPost.user_id,
+                            User.username, CommunityPost.created_at) \
+        .join(User, User.id == CommunityPost.user_id)
+
+
+def _claim(post_id, now):
+    table = CommunityPost.__table__
+    result = db.session.execute(
+        table.update()
+        .where(db.and_(table.c.id == post_id, table.c.classified_at.is_(None)))
+        .values(classified_at=now))
+    return result.rowcount == 1
+
+
+def _mark_failed(post_id, now, error):
+    table = CommunityPost.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.id == post_id)
+        .values(classified_at=now, classify_error=error[:ERROR_MAX_LENGTH]))
+
+
+def process_posts(posts):
+    """在一个事务中认领并处理一批动态，返回实际处理的数量；单条出错时只回滚这一条"""
+    now = datetime.utcnow()
+    processed = 0
+    try:
+        for post in posts:
+            savepoint = db.session.begin_nested()
+            try:
+                if not _claim(post.id, now):
+                    savepoint.commit()
+                    continue
+                for category, keywords in classifier.classify(post.content).items():
+                    handler = _handlers.get(category)
+                    if handler is not None:
+                        handler(post, keywords)
+                savepoint.commit()
+            except Exception as e:
+                savepoint.rollback()
+                current_app.logger.error(f"社区动态 {post.id} 分类出错: {str(e)}")
+                _mark_failed(post.id, now, f"{type(e).__name__}: {e}")
+                continue
+            processed += 1
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return processed
+
+
+def classify_backlog(batch_size=1000, older_than=None):
+    """分批处理 classified_at 为空的动态，按 id 顺序，返回处理数量"""
+    processed = 0
+    last_id = 0
+    while True:
+        query = _posts_query().filter(CommunityPost.classified_at.is_(None), CommunityPost.id > last_id)
+        if older_than is not None:
+            query = query.filter(CommunityPost.created_at < older_than)
+        posts = query.order_by(CommunityPost.id).limit(batch_size).all()
+        if not posts:
+            return processed
+        processed += process_posts(posts)
+        last_id = posts[-1].id
+
+
+def sweep():
+    """定时任务：补处理入队后长时间未分类的动态"""
+    return classify_backlog(older_than=datetime.utcnow() - SWEEP_DELAY)
+
+
+# ========== 队列和后台线程 ==========
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _run(app):
+    while True:
+        post_ids = [_queue.get()]
+        # 把已经排队的一起取出，合并成一个事务
+        while len(post_ids) < 100:
+            try:
+                post_ids.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        with app.app_context():
+            try:
+                process_posts(_posts_query().filter(CommunityPost.id.in_(post_ids)).all())
+            except Exception as e:
+                app.logger.error(f"社区动态分类出错: {str(e)}")
+            finally:
+                db.session.remove()
+
+
+def enqueue(app, post_id):
+    """新动态提交后调用，首次调用时启动后台线程"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, args=(app,), name='classify-worker', daemon=True)
+            _worker.start()
+    _queue.put(post_id)
+
+
+health.register_component('classify_queue', lambda: {'depth': _queue.qsize()})
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description='批量分类未处理的社区动态')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        count = classify_backlog(args.batch_size)
+    print(f"已处理 {count} 条社区动态")
@@ -0,0 +1,170 @@
+"""数据导出（财务、BI 分析用）
+
+按创建时间范围导出交易、账本分录、文档和需求，不需要复制整个数据库文件：
+
+    python export.py transactions --start 2024-06-01 --end 2024-06-02 --format csv -o transactions.csv
+    python export.py demands --format parquet -o demands.parquet
+
+管理员也可以直接下载（CSV / JSONL）：GET /admin/export/transactions.csv?start=2024-06-01&end=2024-06-02
+
+- 按 (created_at, id) 键集分页，每次读取 EXPORT_CHUNK_SIZE 行，每块一个短事务，
+  不会长时间持有读锁挡住写入；内存占用与总行数无关
+- 交易包含已归档的行（archive.py），每块从原表和归档表各取一块合并
+- start 含、end 不含，日期按 UTC；不指定则不限
+- Parquet 需要安装 pyarrow，每块写成一个 row group，只支持写入文件
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+import archive
+from models import db, Transaction, LedgerEntry, Document, Demand
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 5000))
+
+# 导出的列：(列名, 类型)，类型用于 Parquet 结构和 JSON 序列化；文档正文不导出
+DATASETS = {
+    'transactions': (Transaction, [
+        ('id', 'int'), ('user_id', 'int'), ('document_id', 'int'), ('amount', 'int'),
+        ('transaction_type', 'str'), ('description', 'str'), ('created_at', 'datetime'),
+    ]),
+    'ledger_entries': (LedgerEntry, [
+        ('id', 'int'), ('txn_id', 'str'), ('account', 'str'), ('user_id', 'int'), ('document_id', 'int'),
+        ('amount', 'int'), ('entry_type', 'str'), ('description', 'str'), ('created_at', 'datetime'),
+    ]),
+    'documents': (Document, [
+        ('id', 'int'), ('title', 'str'), ('price', 'int'), ('status', 'str'), ('author_id', 'int'),
+        ('read_count', 'int'), ('hot_score', 'float'), ('created_at', 'datetime'),
+    ]),
+    'demands': (Demand, [
+        ('id', 'int'), ('title', 'str'), ('demand_type', 'str'), ('points_required', 'int'), ('user_id', 'int'),
+        ('status', 'str'), ('source_post_id', 'int'), ('created_at', 'datetime'),
+    ]),
+}
+
+# 有归档表的数据集 -> archive.ARCHIVES 中的名称
+ARCHIVED = {'transactions': 'transaction'}
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def parse_date(value):
+    """YYYY-MM-DD 或 ISO 时间，空值返回 None"""
+    return datetime.fromisoformat(value) if value else None
+
+
+def _chunk_query(table, columns, start, end, last, chunk_size):
+    """单张表上 (created_at, id) 在 last 之后的一块"""
+    created_at, id_ = table.c.created_at, table.c.id
+    query = db.select([table.c[name] for name, _ in columns]).order_by(created_at, id_).limit(chunk_size)
+    if start is not None:
+        query = query.where(created_at >= start)
+    if end is not None:
+        query = query.where(created_at < end)
+    if last is not None:
+        query = query.where(db.or_(created_at > last[0], db.and_(created_at == last[0], id_ > last[1])))
+    return query
+
+
+def iter_chunks(dataset, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """按 (created_at, id) 顺序逐块产出行（元组列表）"""
+    model, columns = DATASETS[dataset]
+    last = None
+    while True:
+        if dataset in ARCHIVED:
+            merged = archive.union(ARCHIVED[dataset],
+                                   lambda table: _chunk_query(table, columns, start, end, last, chunk_size))
+            query = db.select([merged.c[name] for name, _ in columns]) \
+                .order_by(merged.c.created_at, merged.c.id).limit(chunk_size)
+        else:
+            query = _chunk_query(model.__table__, columns, start, end, last, chunk_size)
+        # 每块单独一个短事务，读完即释放
+        with db.engine.connect() as conn:
+            rows = conn.execute(query).fetchall()
+        if not rows:
+            return
+        yield rows
+        last = (rows[-1]['created_at'], rows[-1]['id'])
+        if len(rows) < chunk_size:
+            return
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def format_rows(fmt, names, rows):
+    """把一块行格式化为 CSV 或 JSONL 文本"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return ''.join(json.dumps({name: _json_value(value) for name, value in zip(names, row)},
+                              ensure_ascii=False) + '\n' for row in rows)
+
+
+def stream(dataset, fmt, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """逐块产出 CSV（第一块为表头）或 JSONL 文本，用于流式响应"""
+    names = [name for name, _ in DATASETS[dataset][1]]
+    if fmt == 'csv':
+        yield format_rows(fmt, None, [names])
+    for rows in iter_chunks(dataset, start, end, chunk_size):
+        yield format_rows(fmt, names, rows)
+
+
+def write_parquet(dataset, path, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('导出 Parquet 需要安装 pyarrow')
+    types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(), 'datetime': pa.timestamp('us')}
+    columns = DATASETS[dataset][1]
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in iter_chunks(dataset, start, end, chunk_size):
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array([row[i] for row in rows], type=schema.field(i).type) for i in range(len(columns))],
+                schema=schema))
+            count += len(rows)
+    return count
+
+
+def export(dataset, fmt, path, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """写入文件，返回行数"""
+    if fmt == 'parquet':
+        return write_parquet(dataset, path, start, end, chunk_size)
+    names = [name for name, _ in DATASETS[dataset][1]]
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            f.write(format_rows(fmt, None, [names]))
+        for rows in iter_chunks(dataset, start, end, chunk_size):
+            f.write(format_rows(fmt, names, rows))
+            count += len(rows)
+    return count
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description='导出数据（CSV / JSONL / Parquet）')
+    parser.add_argument('dataset', choices=sorted(DATASETS))
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--start', help='起始日期（含），例如 2024-06-01')
+    parser.add_argument('--end', help='结束日期（不含）')
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        count = export(args.dataset, args.format, args.output,
+                       parse_date(args.start), parse_date(args.end), args.chunk_size)
+        print(f"已导出 {args.dataset} 到 {args.output}（{count} 行），用时 {time.perf_counter() - started:.1f}s")
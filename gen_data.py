@@ -0,0 +1,309 @@
+"""生成大规模测试数据
+
+用法示例（写入独立的数据库文件，避免污染 forklift.db）：
+
+    DATABASE_URL=sqlite:///scale.db python migrate.py
+    DATABASE_URL=sqlite:///scale.db python gen_data.py --users 100000 --documents 200000
+
+所有数据通过 Core insert + executemany 分批写入，不逐个创建 ORM 对象。
+数据分布带有真实的偏斜：少数热门文档吸引大部分评论和购买，
+少数活跃用户贡献大部分评论，购买集中在若干突发时段。
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import app
+from history import rebuild_rollups
+from ledger import FEE_POOL, SYSTEM_ISSUANCE, user_account
+from models import db, User, Document, Transaction, Comment, Reaction, CommunityPost, Demand, LedgerEntry, AccountBalance
+
+TITLE_WORDS = ['液压系统', '电池', '门架', '转向桥', '制动器', '发动机', '变速箱', '货叉', '链条', '控制器']
+TITLE_SUFFIX = ['维修指南', '故障排查', '保养技巧', '拆装步骤', '检测方法']
+COMMENT_TEXTS = ['非常实用的指南！', '按步骤操作解决了问题', '图示再详细一点就好了', '收藏了', '和我遇到的情况一样']
+POST_TEXTS = ['今天修好了一台电动叉车', '求购二手门架链条', '有需求：液压泵上门维修', '分享一个保养小技巧', '急需转向桥配件']
+
+
+def zipf_weights(n, s=1.1):
+    """返回长度为 n 的 Zipf 累积权重，用于 random.choices 的 cum_weights"""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def skewed_ids(rng, first_id, cum_weights, k):
+    """按 Zipf 分布抽取 k 个 id（第一个 id 最热门）"""
+    return rng.choices(range(first_id, first_id + len(cum_weights)), cum_weights=cum_weights, k=k)
+
+
+def random_time(rng, start, end):
+    return start + timedelta(seconds=rng.random() * (end - start).total_seconds())
+
+
+def bursty_time(rng, bursts, start, end):
+    """70% 的事件落在突发时段附近（±2小时），其余均匀分布"""
+    if rng.random() < 0.7:
+        center = rng.choice(bursts)
+        moment = center + timedelta(minutes=rng.gauss(0, 120))
+        return min(max(moment, start), end)
+    return random_time(rng, start, end)
+
+
+def next_id(conn, table):
+    return (conn.execute(db.select([db.func.max(table.c.id)])).scalar() or 0) + 1
+
+
+def insert_batches(conn, table, rows, batch_size, label):
+    """把行生成器按 batch_size 分批插入，每批一个事务"""
+    total = 0
+    started = time.time()
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        with conn.begin():
+            conn.execute(table.insert(), batch)
+        total += len(batch)
+        print(f"\r{label}: {total} 行 ({total / max(time.time() - started, 1e-6):.0f} 行/秒)", end='', flush=True)
+    print()
+    return total
+
+
+def insert_mixed_batches(conn, rows, batch_size, label):
+    """rows 生成 (table, row) 对，每批内按表分组后插入，同一批在一个事务中"""
+    total = 0
+    started = time.time()
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        grouped = {}
+        for table, row in batch:
+            grouped.setdefault(table, []).append(row)
+        with conn.begin():
+            for table, table_rows in grouped.items():
+                conn.execute(table.insert(), table_rows)
+        total += len(batch)
+        print(f"\r{label}: {total} 行 ({total / max(time.time() - started, 1e-6):.0f} 行/秒)", end='', flush=True)
+    print()
+    return total
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    end = datetime.utcnow()
+    start = end - timedelta(days=args.days)
+
+    user_table = User.__table__
+    doc_table = Document.__table__
+    txn_table = Transaction.__table__
+    comment_table = Comment.__table__
+    reaction_table = Reaction.__table__
+    post_table = CommunityPost.__table__
+    demand_table = Demand.__table__
+    ledger_table = LedgerEntry.__table__
+    balance_table = AccountBalance.__table__
+
+    with db.engine.connect() as conn:
+        # 批量导入期间关闭同步写盘，大幅减少 fsync 次数
+        conn.execute('PRAGMA synchronous=OFF')
+
+        # ---- 用户 ----
+        first_user = next_id(conn, user_table)
+        user_ids = range(first_user, first_user + args.users)
+        user_weights = zipf_weights(args.users)
+        # 用户余额在内存中跟踪，最后一次性写回 User.points
+        balances = [0] * args.users
+        system_deltas = {SYSTEM_ISSUANCE: 0, FEE_POOL: 0}
+
+        def txn_id():
+            return f'{rng.getrandbits(128):032x}'
+
+        def ledger_rows(legs, document_id, moment):
+            """与 ledger.post() 相同的写法：分录 + 用户收支明细"""
+            tid = txn_id()
+            for account, uid, amount, entry_type, description in legs:
+                yield ledger_table, {
+                    'txn_id': tid, 'account': account, 'user_id': uid, 'document_id': document_id,
+                    'amount': amount, 'entry_type': entry_type, 'description': description,
+                    'created_at': moment,
+                }
+                if uid is None:
+                    system_deltas[account] += amount
+                else:
+                    balances[uid - first_user] += amount
+                    yield txn_table, {
+                        'user_id': uid, 'document_id': document_id, 'amount': amount,
+                        'transaction_type': entry_type, 'description': description, 'created_at': moment,
+                    }
+
+        def users():
+            for uid in user_ids:
+                created_at = random_time(rng, start, end)
+                yield user_table, {
+                    'id': uid,
+                    'username': f'gen_user_{uid}',
+                    'password': 'pass123',
+                    'points': 0,
+                    'created_at': created_at,
+                }
+                opening = rng.randint(100, 5000)
+                yield from ledger_rows([
+                    (SYSTEM_ISSUANCE, None, -opening, 'opening', '初始积分'),
+                    (user_account(uid), uid, opening, 'opening', '初始积分'),
+                ], None, created_at)
+        insert_mixed_batches(conn, users(), args.batch_size, '用户')
+
+        # ---- 文档：少数高产作者写了大部分文档 ----
+        first_doc = next_id(conn, doc_table)
+        doc_authors = skewed_ids(rng, first_user, user_weights, args.documents)
+        doc_prices = [rng.choice((100, 120, 150, 200, 300, 500)) for _ in range(args.documents)]
+        doc_weights = zipf_weights(args.documents)
+
+        def documents():
+            for i in range(args.documents):
+                roll = rng.random()
+                status = 'approved' if roll < 0.8 else 'pending' if roll < 0.95 else 'rejected'
+                yield {
+                    'id': first_doc + i,
+                    'title': f'{rng.choice(TITLE_WORDS)}{rng.choice(TITLE_SUFFIX)} #{first_doc + i}',
+                    'content': '详细维修步骤...' * rng.randint(5, 200),
+                    'price': doc_prices[i],
+                    'status': status,
+                    'author_id': doc_authors[i],
+                    'read_count': 0,
+                    'created_at': random_time(rng, start, end),
+                }
+        insert_batches(conn, doc_table, documents(), args.batch_size, '文档')
+
+        # ---- 评论/点赞/差评：热门文档 × 活跃用户；同一用户对同一文档的点赞/差评只保留最后一次 ----
+        reactions = {}
+
+        def comments():
+            remaining = args.comments
+            while remaining > 0:
+                k = min(args.batch_size, remaining)
+                doc_ids = skewed_ids(rng, first_doc, doc_weights, k)
+                commenter_ids = skewed_ids(rng, first_user, user_weights, k)
+                for doc_id, uid in zip(doc_ids, commenter_ids):
+                    roll = rng.random()
+                    created_at = random_time(rng, start, end)
+                    if roll < 0.7:
+                        yield {
+                            'content': rng.choice(COMMENT_TEXTS),
+                            'document_id': doc_id,
+                            'user_id': uid,
+                            'comment_type': 'comment',
+                            'created_at': created_at,
+                        }
+                    else:
+                        reactions[doc_id, uid] = ('like' if roll < 0.95 else 'dislike', created_at)
+                remaining -= k
+        insert_batches(conn, comment_table, comments(), args.batch_size, '评论')
+        insert_batches(conn, reaction_table, ({
+            'document_id': doc_id, 'user_id': uid, 'reaction_type': reaction_type, 'updated_at': updated_at,
+        } for (doc_id, uid), (reaction_type, updated_at) in reactions.items()), args.batch_size, '点赞/差评')
+
+        # ---- 购买：突发时段集中成交，与 purchase_document() 记录的交易一致 ----
+        bursts = [random_time(rng, start, end) for _ in range(max(1, args.days * 2))]
+        read_counts = [0] * args.documents
+
+        def purchases():
+            remaining = args.purchases
+            while remaining > 0:
+                k = min(args.batch_size, remaining)
+                doc_ids = skewed_ids(rng, first_doc, doc_weights, k)
+                for doc_id in doc_ids:
+                    reader_id = rng.choice(user_ids)
+                    author_id = doc_authors[doc_id - first_doc]
+                    price = doc_prices[doc_id - first_doc]
+                    # 作者不需要购买自己的文档，余额不足的读者买不了
+                    if reader_id == author_id or balances[reader_id - first_user] < price:
+                        continue
+                    read_counts[doc_id - first_doc] += 1
+                    platform_fee = max(1, int(price * 0.1))
+                    yield from ledger_rows([
+                        (user_account(reader_id), reader_id, -price, 'purchase', f'购买文档阅读权限 ({price}分)'),
+                        (user_account(author_id), author_id, price, 'read', f'文档收入 (实得{price - platform_fee}分)'),
+                        (user_account(author_id), author_id, -platform_fee, 'fee', f'平台手续费 ({price}的10%)'),
+                        (FEE_POOL, None, platform_fee, 'fee', None),
+                    ], doc_id, bursty_time(rng, bursts, start, end))
+                remaining -= k
+        insert_mixed_batches(conn, purchases(), args.batch_size, '购买分录')
+
+        # 阅读量与购买记录保持一致
+        update_reads = doc_table.update().where(
+            doc_table.c.id == db.bindparam('doc_id')).values(read_count=db.bindparam('reads'))
+        read_rows = ({'doc_id': first_doc + i, 'reads': n} for i, n in enumerate(read_counts) if n)
+        while True:
+            batch = list(itertools.islice(read_rows, args.batch_size))
+            if not batch:
+                break
+            with conn.begin():
+                conn.execute(update_reads, batch)
+
+        # 余额与分录保持一致
+        update_points = user_table.update().where(
+            user_table.c.id == db.bindparam('uid')).values(points=db.bindparam('balance'))
+        point_rows = ({'uid': first_user + i, 'balance': b} for i, b in enumerate(balances))
+        while True:
+            batch = list(itertools.islice(point_rows, args.batch_size))
+            if not batch:
+                break
+            with conn.begin():
+                conn.execute(update_points, batch)
+        with conn.begin():
+            for account, delta in system_deltas.items():
+                conn.execute(balance_table.update().where(balance_table.c.account == account)
+                             .values(balance=balance_table.c.balance + delta))
+        rebuild_rollups(conn)
+
+        # ---- 社区动态 ----
+        def posts():
+            poster_ids = skewed_ids(rng, first_user, user_weights, args.posts)
+            for uid in poster_ids:
+                yield {
+                    'content': rng.choice(POST_TEXTS),
+                    'user_id': uid,
+                    'created_at': random_time(rng, start, end),
+                }
+        insert_batches(conn, post_table, posts(), args.batch_size, '社区动态')
+
+        # ---- 需求 ----
+        def demands():
+            for _ in range(args.demands):
+                uid = rng.choice(user_ids)
+                yield {
+                    'title': f'{rng.choice(TITLE_WORDS)}{rng.choice(("维修", "配件"))}需求',
+                    'description': rng.choice(POST_TEXTS),
+                    'demand_type': rng.choice(('service', 'parts')),
+                    'points_required': rng.choice((50, 100, 200, 500)),
+                    'user_id': uid,
+                    'created_at': random_time(rng, start, end),
+                    'status': 'active' if rng.random() < 0.6 else 'completed',
+                    'contact_info': f'gen_user_{uid}',
+                }
+        insert_batches(conn, demand_table, demands(), args.batch_size, '需求')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量生成带偏斜分布的测试数据')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--documents', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=200000)
+    parser.add_argument('--purchases', type=int, default=100000)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--demands', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=180, help='数据覆盖的天数')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.time()
+        generate(args)
+        print(f"测试数据生成完成，耗时 {time.time() - started:.1f} 秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""健康检查
+
+后台线程每隔 HEALTH_CHECK_SECONDS 秒（默认15秒）探测一次数据库和已注册的组件，
+结果缓存在内存中；健康检查接口只读缓存，轮询不再触及数据库：
+
+- /healthz          存活检查：进程能响应即返回 200，不做任何探测
+- /readyz           就绪检查：最近一次探测成功且未过期返回 200，否则 503
+- /api/system_status 完整结果：数据库延迟、连接池使用情况、各组件状态（如队列长度）
+
+其他模块用 register_component(name, probe) 注册组件，probe 在应用上下文中执行并返回一个 dict，
+抛出异常视为该组件异常，整体状态降级为 degraded。
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import jsonify
+
+from models import db, Document
+
+HEALTH_CHECK_SECONDS = int(os.environ.get('HEALTH_CHECK_SECONDS', 15))
+# 超过3个探测周期没有新结果视为未就绪（探测线程可能已卡住）
+STALE_AFTER_SECONDS = HEALTH_CHECK_SECONDS * 3
+
+_components = {}
+_result = None
+_lock = threading.Lock()
+_thread = None
+
+
+def register_component(name, probe):
+    _components[name] = probe
+
+
+def _pool_status(pool):
+    status = {'class': type(pool).__name__}
+    for key, method in (('size', 'size'), ('checked_out', 'checkedout'), ('overflow', 'overflow')):
+        if hasattr(pool, method):
+            status[key] = getattr(pool, method)()
+    return status
+
+
+def probe():
+    """执行一次完整探测，需要在应用上下文中调用"""
+    started = time.perf_counter()
+    database = {'ok': True}
+    try:
+        with db.engine.connect() as conn:
+            conn.execute('SELECT 1')
+    except Exception as e:
+        database = {'ok': False, 'error': str(e)}
+    database['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+    components = {}
+    if database['ok']:
+        for name, component_probe in _components.items():
+            try:
+                components[name] = dict(component_probe(), ok=True)
+            except Exception as e:
+                components[name] = {'ok': False, 'error': str(e)}
+        db.session.remove()
+
+    if not database['ok']:
+        status = 'error'
+    elif all(c['ok'] for c in components.values()):
+        status = 'good'
+    else:
+        status = 'degraded'
+    return {
+        'status': status,
+        'checked_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        'checked_monotonic': time.monotonic(),
+        'database': database,
+        'pool': _pool_status(db.engine.pool),
+        'components': components,
+    }
+
+
+def _run(app):
+    global _result
+    while True:
+        with app.app_context():
+            try:
+                result = probe()
+            except Exception as e:
+                app.logger.error(f"健康检查出错: {str(e)}")
+                result = None
+        if result is not None:
+            with _lock:
+                _result = result
+        time.sleep(HEALTH_CHECK_SECONDS)
+
+
+def current_status(app):
+    """最近一次探测结果；首次调用时先同步探测一次并启动后台线程"""
+    global _thread, _result
+    with _lock:
+        if _thread is None:
+            _result = probe()
+            _thread = threading.Thread(target=_run, args=(app,), name='health-check', daemon=True)
+            _thread.start()
+        return _result
+
+
+def _review_queue():
+    return {'depth': Document.query.filter_by(status='pending').count()}
+
+
+register_component('review_queue', _review_queue)
+
+
+def init_app(app):
+    @app.route('/healthz')
+    def healthz():
+        return jsonify({'status': 'ok'})
+
+    @app.route('/readyz')
+    def readyz():
+        result = current_status(app)
+        ready = result['database']['ok'] and time.monotonic() - result['checked_monotonic'] < STALE_AFTER_SECONDS
+        return jsonify({'ready': ready, 'checked_at': result['checked_at']}), 200 if ready else 503
+
+    @app.route('/api/system_status')
+    def system_status():
+        """检查系统状态（读取后台探测的缓存结果）"""
+        result = dict(current_status(app))
+        result['age_seconds'] = round(time.monotonic() - result.pop('checked_monotonic'), 1)
+        return jsonify(result), 503 if result['status'] == 'error' else 200
@@ -0,0 +1,162 @@
+"""用户收支明细和评论的历史查询
+
+- transactions_page() / comments_page(): 按 (created_at, id) 倒序的游标分页，分别走
+  ix_transaction_user_created、ix_comment_document_created 索引，不会加载用户的全部交易或文档的全部评论
+- 交易和评论的旧数据会被归档（archive.py），这里的查询都同时读原表和归档表，调用方不需要区分
+- 月度汇总 transaction_rollup 在 ledger.post() 写入 Transaction 时增量更新，
+  图表直接读汇总行，不扫描明细
+"""
+import base64
+import binascii
+from datetime import datetime
+
+import archive
+import reactions
+from models import db, User, Transaction, TransactionRollup
+
+# 交易类型 -> 月度汇总字段，金额取绝对值累加
+ROLLUP_COLUMNS = {
+    'read': 'income',
+    'purchase': 'spend',
+    'fee': 'fees',
+    'reward': 'rewards',
+    'signup': 'rewards',
+}
+
+CURSOR_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+COMMENT_PAGE_SIZE = 20
+
+
+def encode_cursor(row):
+    """按 (created_at, id) 分页的游标，交易和评论共用"""
+    raw = f'{row.created_at.strftime(CURSOR_TIME_FORMAT)}|{row.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """解析游标，格式不正确时抛出 ValueError"""
+    try:
+        created_at, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.strptime(created_at, CURSOR_TIME_FORMAT), int(transaction_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f'无效的游标: {cursor}') from e
+
+
+def transactions_page(user_id, cursor=None, limit=20):
+    """返回 (交易列表, 下一页游标)，没有更多数据时游标为 None"""
+    if cursor:
+        created_at, transaction_id = decode_cursor(cursor)
+
+    def build(table):
+        query = db.select([table.c[column.name] for column in Transaction.__table__.columns]) \
+            .where(table.c.user_id == user_id)
+        if cursor:
+            query = query.where(db.or_(
+                table.c.created_at < created_at,
+                db.and_(table.c.created_at == created_at, table.c.id < transaction_id)
+            ))
+        return query.order_by(table.c.created_at.desc(), table.c.id.desc()).limit(limit + 1)
+
+    rows = archive.union('transaction', build)
+    rows = db.session.execute(
+        db.select([rows]).order_by(rows.c.created_at.desc(), rows.c.id.desc()).limit(limit + 1)).fetchall()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def has_purchased(user_id, document_id):
+    """是否购买过文档：原表和归档表各查一次索引，合在一个查询里"""
+    def purchased(table):
+        return db.exists().where(db.and_(table.c.user_id == user_id, table.c.document_id == document_id,
+                                         table.c.transaction_type == 'purchase'))
+    return db.session.query(db.or_(*[purchased(table) for table in archive.tables('transaction')])).scalar()
+
+
+def comments_page(document_id, cursor=None, limit=COMMENT_PAGE_SIZE):
+    """文档评论（含已归档的）的一页，附带评论者用户名，返回 (评论列表, 下一页游标)"""
+    if cursor:
+        created_at, comment_id = decode_cursor(cursor)
+
+    def build(table):
+        query = db.select([table.c.id, table.c.content, table.c.user_id, table.c.comment_type, table.c.created_at]) \
+            .where(table.c.document_id == document_id)
+        if cursor:
+            query = query.where(db.or_(
+                table.c.created_at < created_at,
+                db.and_(table.c.created_at == created_at, table.c.id < comment_id)
+            ))
+        return query.order_by(table.c.created_at.desc(), table.c.id.desc()).limit(limit + 1)
+
+    # 两张表各取 limit + 1 行，合并后只为这一页联查用户名
+    comments = archive.union('comment', build)
+    rows = db.session.execute(
+        db.select([comments, User.username])
+        .select_from(comments.join(User.__table__, User.id == comments.c.user_id))
+        .order_by(comments.c.created_at.desc(), comments.c.id.desc()).limit(limit + 1)).fetchall()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def comment_counts(doc_ids, scope=None):
+    """一次查询统计多篇文档的评论数（含已归档的）和点赞、差评数：{doc_id: {'like': n, 'comment': n, ...}}
+
+    文档较多时（例如首页的全部已审核文档）传入 scope：返回文档 id 的子查询，按它过滤而不是绑定 id 列表，
+    查询次数和参数个数不随文档数增长。
+    """
+    counts = {doc_id: {'comment': 0, 'like': 0, 'dislike': 0} for doc_id in doc_ids}
+    documents = scope if scope is not None else doc_ids
+
+    def build(table):
+        return db.select([table.c.document_id, table.c.comment_type, db.func.count().label('count')]) \
+            .where(table.c.document_id.in_(documents)).group_by(table.c.document_id, table.c.comment_type)
+
+    rows = db.union_all(archive.union('comment', build).select(),
+                        reactions.counts_select(documents).alias().select()).alias()
+    for doc_id, comment_type, count in db.session.execute(db.select([rows])):
+        if doc_id in counts:
+            counts[doc_id][comment_type] = counts[doc_id].get(comment_type, 0) + count
+    return counts
+
+
+def monthly_rollups(user_id, months=12):
+    """最近 months 个有记录的月份汇总，按月份正序"""
+    rows = (TransactionRollup.query
+            .filter_by(user_id=user_id)
+            .order_by(TransactionRollup.month.desc())
+            .limit(months)
+            .all())
+    return list(reversed(rows))
+
+
+def bump_rollup(user_id, created_at, transaction_type, amount):
+    """在当前事务中把一条交易累加到月度汇总"""
+    column = ROLLUP_COLUMNS.get(transaction_type)
+    if column is None:
+        return
+    table = TransactionRollup.__table__
+    month = created_at.strftime('%Y-%m')
+    result = db.session.execute(
+        table.update()
+        .where(db.and_(table.c.user_id == user_id, table.c.month == month))
+        .values({column: table.c[column] + abs(amount)}))
+    if result.rowcount != 1:
+        row = dict.fromkeys(('income', 'spend', 'fees', 'rewards'), 0)
+        row.update({'user_id': user_id, 'month': month, column: abs(amount)})
+        db.session.execute(table.insert().values(row))
+
+
+def rebuild_rollups(conn):
+    """按 Transaction 全量重算月度汇总（批量导入数据后使用），包含已归档的交易"""
+    source = ' UNION ALL '.join(f'SELECT user_id, created_at, transaction_type, amount FROM "{table.name}"'
+                                for table in archive.tables('transaction'))
+    with conn.begin():
+        conn.execute('DELETE FROM transaction_rollup')
+        conn.execute(f"""
+            INSERT INTO transaction_rollup (user_id, month, income, spend, fees, rewards)
+            SELECT user_id, strftime('%Y-%m', created_at),
+                   SUM(CASE WHEN transaction_type = 'read' THEN amount ELSE 0 END),
+                   SUM(CASE WHEN transaction_type = 'purchase' THEN -amount ELSE 0 END),
+                   SUM(CASE WHEN transaction_type = 'fee' THEN -amount ELSE 0 END),
+                   SUM(CASE WHEN transaction_type IN ('reward', 'signup') THEN amount ELSE 0 END)
+            FROM ({source})
+            GROUP BY user_id, strftime('%Y-%m', created_at)""")
@@ -0,0 +1,105 @@
+"""响应压缩和条件请求
+
+- 超过 COMPRESS_MIN_SIZE 字节的 HTML/JSON/CSS/JS 响应按 Accept-Encoding 压缩
+  （安装了 Brotli 时优先 br，否则 gzip）；send_file 和流式响应不处理
+- 视图加上 @conditional(version_func) 后，先用 version_func 取数据版本（通常是一条很轻的查询），
+  生成弱 ETag 和 Last-Modified；客户端缓存的版本没变时直接返回 304，不执行视图也不传输正文
+
+version_func 接收与视图相同的 URL 参数，返回 (版本, 最后修改时间)，版本为 None 表示不做条件处理。
+ETag 中包含请求路径和当前登录用户，同一地址不同用户的页面不会互相命中。
+"""
+import functools
+import gzip
+import hashlib
+from datetime import timezone
+
+from flask import current_app, make_response, request, session
+
+try:
+    import brotli
+except ImportError:  # 没有安装 Brotli 时只使用 gzip
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_MIMETYPES = {'text/html', 'application/json', 'text/css', 'application/javascript', 'text/plain'}
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _choose_encoding():
+    encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+    for encoding in encodings:
+        if encoding in request.accept_encodings:
+            return encoding
+    return None
+
+
+def init_app(app):
+    app.config.setdefault('COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE)
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESS_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = _choose_encoding()
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(_compress(data, encoding))
+        response.content_encoding = encoding
+        # 正文已变，强 ETag 不再成立
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return request.if_modified_since >= last_modified
+    return False
+
+
+def conditional(version_func):
+    """按数据版本处理 If-None-Match / If-Modified-Since"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # 有待显示的 flash 消息时页面内容与缓存不同，不做条件处理
+            if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+                return view(*args, **kwargs)
+            version, last_modified = version_func(**kwargs)
+            if version is None:
+                return view(*args, **kwargs)
+
+            raw = f"{request.full_path}|{session.get('user_id')}|{version}"
+            etag = hashlib.md5(raw.encode()).hexdigest()
+            if last_modified is not None:
+                last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # 允许浏览器缓存，但每次使用前都要回源验证
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,173 @@
+"""幂等提交
+
+重复点击或网络重试会让购买、评论、发布动态执行两次（重复扣款、重复评论）。
+视图加上 @idempotent 后，带同一幂等键的重复请求直接返回第一次的响应，不再执行视图：
+
+- 幂等键取自请求头 Idempotency-Key 或表单字段 idempotency_key；表单中用
+  <input type="hidden" name="idempotency_key" value="{{ idempotency_key() }}"> 每次渲染生成一个新键，
+  没有幂等键的请求照常执行
+- 按 (用户, 幂等键 + 请求路径 + 表单内容的摘要) 存在 idempotency_key 表中，重试时一次主键查询即可取回响应；
+  同一个键提交了不同的内容（例如表单校验失败后修改再提交）视为新的请求
+- 第一次请求执行前先插入一条占位记录，并发的重复请求最多等待 IDEMPOTENCY_WAIT_SECONDS 秒取第一次的结果，
+  仍未完成时返回 409；视图出错（异常、5xx，或视图捕获异常回滚后调用了 discard()）时删除占位记录，允许重试
+- 占位记录只保留 IDEMPOTENCY_LEASE_SECONDS 秒：进程在提交后、保存响应前崩溃留下的占位记录过期后可以重新认领，
+  不会在整个保留期内挡住这个键
+- 记录保留 IDEMPOTENCY_TTL_SECONDS 秒，过期的由 tasks.py 定时调用 purge_expired() 批量删除
+
+与会话存储一样使用独立的数据库连接，不影响视图中 db.session 的事务。
+"""
+import functools
+import hashlib
+import os
+import secrets
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, g, make_response, request, session
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdempotencyKey
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 10))
+# 占位记录的有效期，应长于视图的最长执行时间
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 60))
+IDEMPOTENCY_POLL_SECONDS = 0.1
+HEADER = 'Idempotency-Key'
+FORM_FIELD = 'idempotency_key'
+KEY_MAX_LENGTH = 100
+# 只保存重放所需的响应头
+STORED_HEADERS = ('Content-Type', 'Location')
+
+table = IdempotencyKey.__table__
+
+
+def new_key():
+    """模板中生成表单用的幂等键"""
+    return secrets.token_urlsafe(16)
+
+
+def request_key():
+    """请求携带的幂等键，没有或格式不对时返回 None"""
+    key = request.headers.get(HEADER) or request.form.get(FORM_FIELD)
+    if not key or len(key) > KEY_MAX_LENGTH:
+        return None
+    return key
+
+
+def discard():
+    """视图捕获异常并回滚后调用：本次响应不保存，释放幂等键，用同一个键重试时重新执行"""
+    g.idempotency_discard = True
+
+
+def fingerprint(key):
+    """幂等键、请求路径和表单内容的摘要，内容不同的请求不会互相重放"""
+    digest = hashlib.sha256()
+    for part in (key, request.method, request.path):
+        digest.update(part.encode('utf-8') + b'\0')
+    for name, value in sorted(request.form.items(multi=True)):
+        if name != FORM_FIELD:
+            digest.update(f'{name}={value}'.encode('utf-8') + b'\0')
+    return digest.hexdigest()[:32]
+
+
+def _load(user_id, digest):
+    with db.engine.connect() as conn:
+        return conn.execute(
+            db.select([table.c.status_code, table.c.headers, table.c.body, table.c.expires_at])
+            .where(db.and_(table.c.user_id == user_id, table.c.key == digest))).first()
+
+
+def _claim(user_id, digest):
+    """插入占位记录（有效期 IDEMPOTENCY_LEASE_SECONDS 秒），已存在（重复请求）时返回 False"""
+    now = datetime.utcnow()
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(table.delete().where(db.and_(
+                table.c.user_id == user_id, table.c.key == digest, table.c.expires_at < now)))
+            conn.execute(table.insert().values(
+                user_id=user_id, key=digest, created_at=now,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _store(user_id, digest, response):
+    headers = '\n'.join(f'{name}: {response.headers[name]}' for name in STORED_HEADERS if name in response.headers)
+    with db.engine.begin() as conn:
+        conn.execute(table.update().where(db.and_(table.c.user_id == user_id, table.c.key == digest))
+                     .values(status_code=response.status_code, headers=headers, body=response.get_data(),
+                             expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)))
+
+
+def _release(user_id, digest):
+    with db.engine.begin() as conn:
+        conn.execute(table.delete().where(db.and_(table.c.user_id == user_id, table.c.key == digest)))
+
+
+def _replay(row):
+    response = current_app.response_class(row.body, status=row.status_code)
+    for line in filter(None, (row.headers or '').split('\n')):
+        name, value = line.split(': ', 1)
+        response.headers[name] = value
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _wait_for(user_id, digest):
+    """等待并发的第一次请求完成，返回其响应；超时返回 409"""
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        row = _load(user_id, digest)
+        if row is not None and row.status_code is not None:
+            return _replay(row)
+        if row is None or time.monotonic() >= deadline:
+            return current_app.response_class('请求正在处理中，请稍后重试', status=409, mimetype='text/plain')
+        time.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+
+def idempotent(view):
+    """带幂等键的重复请求返回第一次的响应，需要登录（未登录的请求照常执行，由视图处理）"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request_key()
+        user_id = session.get('user_id')
+        if key is None or user_id is None:
+            return view(*args, **kwargs)
+        digest = fingerprint(key)
+        row = _load(user_id, digest)
+        if row is not None and row.expires_at > datetime.utcnow():
+            return _replay(row) if row.status_code is not None else _wait_for(user_id, digest)
+        if not _claim(user_id, digest):
+            return _wait_for(user_id, digest)
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _release(user_id, digest)
+            raise
+        if response.status_code >= 500 or response.is_streamed or g.pop('idempotency_discard', False):
+            _release(user_id, digest)
+        else:
+            _store(user_id, digest, response)
+        return response
+    return wrapper
+
+
+def purge_expired(batch_size=5000):
+    """分批删除过期记录，避免长时间锁表，返回删除数量"""
+    deleted = 0
+    with db.engine.connect() as conn:
+        while True:
+            with conn.begin():
+                expired = db.select([table.c.user_id, table.c.key]) \
+                    .where(table.c.expires_at < datetime.utcnow()).limit(batch_size)
+                count = conn.execute(table.delete().where(
+                    db.tuple_(table.c.user_id, table.c.key).in_(expired))).rowcount
+            deleted += count
+            if count < batch_size:
+                return deleted
+
+
+def init_app(app):
+    app.jinja_env.globals['idempotency_key'] = new_key
@@ -0,0 +1,229 @@
+"""批量导入文档（JSONL / CSV）
+
+已有的维修手册不必逐篇粘贴到提交页面，整理成文件后一次导入，导入的文档与页面提交一样进入待审核：
+
+    python import_documents.py manuals.jsonl --author ops
+    python import_documents.py manuals.csv --author ops --batch-size 500
+
+- JSONL 每行一个对象，CSV 第一行为表头；字段 title、content 必填，price 可选（默认 100，不能低于 100），
+  author 可选（用户名，缺省时使用 --author）
+- 逐行读取，文件再大也只占用一个批次的内存；每 --batch-size 行用 executemany 插入并提交一次
+- 校验失败的行不导入，该行在文件中的字节位置、原因和原始内容写入错误报告（默认 <文件名>.errors.jsonl），其余行照常导入
+- 每个批次提交时在同一事务中记录已处理到的文件位置（job_watermark），中断后重新执行同一命令从断点继续，
+  --restart 从头导入；断点按文件路径、大小和修改时间区分，文件修改或重新生成后从头导入，导入完成后删除断点
+- 导入完成后为新文档建立查重索引并标记疑似重复（dedup.py），--no-dedup 跳过
+"""
+import csv
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+from models import db, User, Document, JobWatermark
+
+MIN_PRICE = 100
+DEFAULT_PRICE = 100
+TITLE_MAX_LENGTH = 200
+
+
+class RowError(ValueError):
+    pass
+
+
+class LineReader:
+    """按行读取二进制文件并记录读取位置，用于断点续传（文本模式迭代时无法 tell）"""
+
+    def __init__(self, f):
+        self.f = f
+        self.position = f.tell()
+
+    def __iter__(self):
+        while True:
+            line = self.f.readline()
+            if not line:
+                return
+            self.position = self.f.tell()
+            yield line.decode('utf-8-sig')
+
+
+def read_jsonl(f, start):
+    """逐行产出 (起始位置, 结束位置, 行内容或 RowError)"""
+    f.seek(start)
+    reader = LineReader(f)
+    offset = start
+    for line in reader:
+        if line.strip():
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError('不是 JSON 对象')
+            except ValueError as e:
+                row = RowError(f'JSON 格式错误: {e}')
+            yield offset, reader.position, row
+        offset = reader.position
+
+
+def read_csv(f, start):
+    """csv 模块只在需要时读取下一行（字段内可以有换行），每条记录产出后 position 即为其结束位置"""
+    f.seek(0)
+    header_reader = LineReader(f)
+    header = next(csv.reader(header_reader))
+    offset = max(start, header_reader.position)
+    f.seek(offset)
+    reader = LineReader(f)
+    for record in csv.reader(reader):
+        if any(field.strip() for field in record):
+            if len(record) != len(header):
+                yield offset, reader.position, RowError(f'列数 {len(record)} 与表头 {len(header)} 不一致')
+            else:
+                yield offset, reader.position, dict(zip(header, record))
+        offset = reader.position
+
+
+READERS = {'.jsonl': read_jsonl, '.json': read_jsonl, '.csv': read_csv}
+
+
+class AuthorCache:
+    def __init__(self, default_username):
+        self.default_username = default_username
+        self._ids = {}
+
+    def resolve(self, username):
+        username = (username or self.default_username or '').strip()
+        if not username:
+            raise RowError('缺少作者（author 字段或 --author）')
+        if username not in self._ids:
+            self._ids[username] = db.session.query(User.id).filter_by(username=username).scalar()
+        if self._ids[username] is None:
+            raise RowError(f'作者不存在: {username}')
+        return self._ids[username]
+
+
+def validate(row, authors, now):
+    """返回可直接插入 document 表的字典，校验规则与提交页面一致"""
+    title = str(row.get('title') or '').strip()
+    content = str(row.get('content') or '').strip()
+    if not title or not content:
+        raise RowError('标题和内容不能为空')
+    if len(title) > TITLE_MAX_LENGTH:
+        raise RowError(f'标题不能超过{TITLE_MAX_LENGTH}字')
+    price = row.get('price')
+    if price is None or str(price).strip() == '':
+        price = DEFAULT_PRICE
+    try:
+        price = int(str(price).strip())
+    except ValueError:
+        raise RowError(f'价格不是整数: {price}')
+    if price < MIN_PRICE:
+        raise RowError(f'阅读价格不能低于{MIN_PRICE}分')
+    return {
+        'title': title,
+        'content': content,
+        'price': price,
+        'status': 'pending',
+        'author_id': authors.resolve(row.get('author')),
+        'read_count': 0,
+        'created_at': now,
+    }
+
+
+def checkpoint_name(path):
+    """断点名称：同一路径的文件被修改或重新生成后大小、修改时间改变，不会沿用旧文件的断点"""
+    stat = os.stat(path)
+    key = f'{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}'
+    return 'import:' + hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+
+
+def _checkpoint(name):
+    return db.session.query(JobWatermark.value).filter_by(name=name).scalar() or 0
+
+
+def _save_checkpoint(name, position):
+    db.session.merge(JobWatermark(name=name, value=position, updated_at=datetime.utcnow()))
+
+
+def _clear_checkpoint(name):
+    db.session.query(JobWatermark).filter_by(name=name).delete(synchronize_session=False)
+
+
+def import_file(path, author=None, batch_size=1000, errors_path=None, restart=False, log=print):
+    """导入文件，返回 (导入数, 错误数)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f'不支持的文件类型: {ext}（支持 {", ".join(READERS)}）')
+    name = checkpoint_name(path)
+    if restart:
+        _clear_checkpoint(name)
+        db.session.commit()
+    start = _checkpoint(name)
+    if start:
+        log(f"从断点继续：文件位置 {start}")
+
+    authors = AuthorCache(author)
+    table = Document.__table__
+    imported = failed = 0
+    batch = []
+    errors_path = errors_path or path + '.errors.jsonl'
+    with open(path, 'rb') as f, open(errors_path, 'w' if restart or not start else 'a', encoding='utf-8') as errors:
+
+        def flush(position, done=False):
+            nonlocal imported
+            if batch:
+                db.session.execute(table.insert(), batch)
+            # 最后一批与删除断点在同一事务中提交，再次执行同一文件时从头导入
+            if done:
+                _clear_checkpoint(name)
+            else:
+                _save_checkpoint(name, position)
+            db.session.commit()
+            imported += len(batch)
+            batch.clear()
+            errors.flush()
+
+        position = start
+        now = datetime.utcnow()
+        for offset, position, row in READERS[ext](f, start):
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                batch.append(validate(row, authors, now))
+            except RowError as e:
+                failed += 1
+                errors.write(json.dumps({'offset': offset, 'error': str(e),
+                                         'row': None if isinstance(row, RowError) else row},
+                                        ensure_ascii=False) + '\n')
+            if len(batch) >= batch_size:
+                flush(position)
+                log(f"已导入 {imported} 篇，错误 {failed} 行")
+                now = datetime.utcnow()
+        flush(position, done=True)
+    if not failed and os.path.exists(errors_path) and os.path.getsize(errors_path) == 0:
+        os.remove(errors_path)
+    return imported, failed
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description='从 JSONL/CSV 批量导入文档（待审核）')
+    parser.add_argument('path')
+    parser.add_argument('--author', help='未指定 author 字段时使用的作者用户名')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--errors', help='错误报告路径，默认 <文件名>.errors.jsonl')
+    parser.add_argument('--restart', action='store_true', help='忽略断点，从头导入')
+    parser.add_argument('--no-dedup', action='store_true', help='不建立查重索引')
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        imported, failed = import_file(args.path, args.author, args.batch_size, args.errors, args.restart)
+        print(f"导入完成：{imported} 篇，错误 {failed} 行，用时 {time.perf_counter() - started:.1f}s")
+        if failed:
+            print(f"错误报告: {args.errors or args.path + '.errors.jsonl'}")
+        if not args.no_dedup:
+            import dedup
+            print(f"查重索引 {dedup.index_backlog(args.batch_size)} 篇，"
+                  f"疑似重复 {dedup.flag_pending(args.batch_size)} 篇")
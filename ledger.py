@@ -0,0 +1,207 @@
+"""积分账本
+
+所有积分变动都通过 post() 记一笔复式分录：
+- ledger_entry 只追加，同一 txn_id 下的分录金额合计为0
+- 用户余额物化在 User.points，平台账户余额物化在 account_balance，
+  与分录写入在同一个数据库事务中更新
+- 每条用户分录同时写一条 Transaction，作为用户可见的收支明细，并累加到月度汇总
+
+reconcile() 按固定大小的分块流式核对余额与分录，可单独运行。核对在数据库的在线备份快照
+（backup.snapshot）上进行：所有检查看到同一时刻的数据，对账期间提交的购买不会造成误报，
+也不会长时间持有主库的读锁挡住写入：
+
+    python ledger.py --chunk-size 10000
+"""
+import os
+import tempfile
+import uuid
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import create_engine
+
+import backup
+import history
+from models import db, User, Transaction, LedgerEntry, AccountBalance
+
+MAX_SAMPLES = 100  # 对账报告中每类问题最多保留的样本数
+
+SYSTEM_ISSUANCE = 'system:issuance'  # 系统发行积分（注册赠送、系统奖励），余额为负
+FEE_POOL = 'system:fee_pool'  # 平台手续费池
+
+# 一条分录：account 为账户，amount 为正表示转入、负表示转出
+Leg = namedtuple('Leg', ['account', 'amount', 'entry_type', 'description'])
+Leg.__new__.__defaults__ = (None,)
+
+
+def user_account(user_id):
+    return f'user:{user_id}'
+
+
+def parse_user_id(account):
+    if account.startswith('user:'):
+        return int(account[5:])
+    return None
+
+
+def post(legs, document_id=None, description=None):
+    """在当前 db.session 事务中记一笔账，由调用方负责 commit
+
+    用户账户的扣款使用条件更新，余额不足时抛出 ValueError，调用方应回滚。
+    """
+    if sum(leg.amount for leg in legs) != 0:
+        raise ValueError('分录金额合计不为0')
+
+    txn_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    user_table = User.__table__
+    balance_table = AccountBalance.__table__
+
+    for leg in legs:
+        leg_description = leg.description or description
+        user_id = parse_user_id(leg.account)
+        db.session.add(LedgerEntry(
+            txn_id=txn_id,
+            account=leg.account,
+            user_id=user_id,
+            document_id=document_id,
+            amount=leg.amount,
+            entry_type=leg.entry_type,
+            description=leg_description,
+            created_at=now
+        ))
+
+        if user_id is not None:
+            update = user_table.update().where(user_table.c.id == user_id)
+            if leg.amount < 0:
+                update = update.where(user_table.c.points >= -leg.amount)
+            result = db.session.execute(update.values(points=user_table.c.points + leg.amount))
+            if result.rowcount != 1:
+                raise ValueError('积分不足')
+            db.session.add(Transaction(
+                user_id=user_id,
+                document_id=document_id,
+                amount=leg.amount,
+                transaction_type=leg.entry_type,
+                description=leg_description,
+                created_at=now
+            ))
+            history.bump_rollup(user_id, now, leg.entry_type, leg.amount)
+        else:
+            result = db.session.execute(
+                balance_table.update()
+                .where(balance_table.c.account == leg.account)
+                .values(balance=balance_table.c.balance + leg.amount, updated_at=now))
+            if result.rowcount != 1:
+                db.session.execute(balance_table.insert().values(
+                    account=leg.account, balance=leg.amount, updated_at=now))
+    return txn_id
+
+
+# ========== 对账 ==========
+
+def _add_problem(report, kind, sample):
+    report['problem_counts'][kind] += 1
+    if len(report[kind]) < MAX_SAMPLES:
+        report[kind].append(sample)
+
+
+def _check_transactions_balanced(conn, chunk_size, report):
+    """按 id 分块汇总每笔 txn 的金额，跨块的 txn 暂存未闭合的部分和"""
+    open_sums = {}
+    last_id = 0
+    max_id = conn.execute('SELECT MAX(id) FROM ledger_entry').scalar() or 0
+    entries = 0
+    while last_id < max_id:
+        upper = last_id + chunk_size
+        rows = conn.execute(
+            'SELECT txn_id, SUM(amount), COUNT(*) FROM ledger_entry '
+            'WHERE id > ? AND id <= ? GROUP BY txn_id', last_id, upper)
+        for txn_id, amount, count in rows:
+            entries += count
+            total = open_sums.pop(txn_id, 0) + amount
+            if total != 0:
+                open_sums[txn_id] = total
+        last_id = upper
+    report['entries'] = entries
+    for txn_id, total in open_sums.items():
+        _add_problem(report, 'unbalanced_txns', {'txn_id': txn_id, 'sum': total})
+
+
+def _check_user_balances(conn, chunk_size, report):
+    """按用户 id 分页，逐块比较 User.points 与分录合计"""
+    last_id = 0
+    while True:
+        users = conn.execute(
+            'SELECT id, COALESCE(points, 0) FROM user WHERE id > ? ORDER BY id LIMIT ?',
+            last_id, chunk_size).fetchall()
+        if not users:
+            break
+        first_id, last_id = users[0][0], users[-1][0]
+        ledger_sums = dict(conn.execute(
+            'SELECT user_id, SUM(amount) FROM ledger_entry '
+            'WHERE user_id BETWEEN ? AND ? GROUP BY user_id', first_id, last_id).fetchall())
+        for user_id, points in users:
+            expected = ledger_sums.get(user_id, 0)
+            if points != expected:
+                _add_problem(report, 'user_mismatches',
+                             {'user_id': user_id, 'points': points, 'ledger': expected})
+        report['users'] += len(users)
+
+
+def _check_system_balances(conn, report):
+    ledger_sums = dict(conn.execute(
+        'SELECT account, SUM(amount) FROM ledger_entry WHERE user_id IS NULL GROUP BY account').fetchall())
+    balances = dict(conn.execute('SELECT account, balance FROM account_balance').fetchall())
+    for account in sorted(set(ledger_sums) | set(balances)):
+        if ledger_sums.get(account, 0) != balances.get(account, 0):
+            _add_problem(report, 'account_mismatches',
+                         {'account': account, 'balance': balances.get(account, 0), 'ledger': ledger_sums.get(account, 0)})
+
+
+def reconcile(chunk_size=10000):
+    """在数据库快照上核对账本，返回问题报告；需要在应用上下文中调用，快照写在临时目录"""
+    report = {
+        'entries': 0,
+        'users': 0,
+        'unbalanced_txns': [],
+        'user_mismatches': [],
+        'account_mismatches': [],
+        'problem_counts': {'unbalanced_txns': 0, 'user_mismatches': 0, 'account_mismatches': 0},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'reconcile.db')
+        backup.snapshot(backup.database_path(), path)
+        engine = create_engine(f'sqlite:///{path}')
+        try:
+            with engine.connect() as conn:
+                _check_transactions_balanced(conn, chunk_size, report)
+                _check_user_balances(conn, chunk_size, report)
+                _check_system_balances(conn, report)
+        finally:
+            engine.dispose()
+    report['ok'] = not any(report['problem_counts'].values())
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description='积分账本对账')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        result = reconcile(args.chunk_size)
+    print(f"分录 {result['entries']} 条，用户 {result['users']} 个，问题统计 {result['problem_counts']}")
+    for item in result['unbalanced_txns'][:20]:
+        print(f"  借贷不平: {item}")
+    for item in result['user_mismatches'][:20]:
+        print(f"  用户余额不符: {item}")
+    for item in result['account_mismatches']:
+        print(f"  平台账户余额不符: {item}")
+    print('对账通过' if result['ok'] else '对账发现问题')
+    sys.exit(0 if result['ok'] else 1)
@@ -0,0 +1,71 @@
+"""数据库迁移工具
+
+部署时在启动应用之前单独运行一次：
+
+    python migrate.py            # 升级到最新版本
+    python migrate.py --status   # 查看当前版本和待执行的迁移
+
+应用启动时不再执行 db.create_all()，所有表结构变更都通过 migrations/ 下的脚本完成。
+"""
+import argparse
+import importlib
+import os
+import re
+
+from app import app
+from models import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+def load_migrations():
+    """按 revision 顺序返回 migrations/ 下的所有迁移模块"""
+    modules = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        if re.match(r'^\d{4}_\w+\.py$', filename):
+            modules.append(importlib.import_module(f'migrations.{filename[:-3]}'))
+    modules.sort(key=lambda m: m.revision)
+    revisions = [m.revision for m in modules]
+    if len(set(revisions)) != len(revisions):
+        raise RuntimeError(f'迁移版本号重复: {revisions}')
+    return modules
+
+
+def current_revision(conn):
+    conn.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+    return conn.execute('SELECT MAX(version) FROM schema_version').scalar() or 0
+
+
+def upgrade():
+    """执行所有尚未执行的迁移，每个迁移一个事务"""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            current = current_revision(conn)
+            pending = [m for m in load_migrations() if m.revision > current]
+            for migration in pending:
+                with conn.begin():
+                    migration.upgrade(conn)
+                    conn.execute('INSERT INTO schema_version (version) VALUES (?)', migration.revision)
+                print(f"已执行迁移 {migration.revision:04d}: {(migration.__doc__ or '').strip()}")
+            if not pending:
+                print(f"数据库已是最新版本 ({current:04d})")
+
+
+def status():
+    with app.app_context():
+        with db.engine.connect() as conn:
+            current = current_revision(conn)
+            print(f"当前版本: {current:04d}")
+            for migration in load_migrations():
+                mark = '已执行' if migration.revision <= current else '待执行'
+                print(f"  [{mark}] {migration.revision:04d} {(migration.__doc__ or '').strip()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='数据库迁移')
+    parser.add_argument('--status', action='store_true', help='只显示迁移状态')
+    args = parser.parse_args()
+    if args.status:
+        status()
+    else:
+        upgrade()
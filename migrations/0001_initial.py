@@ -0,0 +1,88 @@
+"""初始表结构（与原先 db.create_all() 生成的结构一致）"""
+revision = 1
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user (
+            id INTEGER NOT NULL,
+            username VARCHAR(80) NOT NULL,
+            password VARCHAR(120) NOT NULL,
+            points INTEGER,
+            created_at DATETIME,
+            PRIMARY KEY (id),
+            UNIQUE (username)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS system_stats (
+            id INTEGER NOT NULL,
+            total_points_created INTEGER,
+            total_fees_collected INTEGER,
+            total_rewards_given INTEGER,
+            PRIMARY KEY (id)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS document (
+            id INTEGER NOT NULL,
+            title VARCHAR(200) NOT NULL,
+            content TEXT NOT NULL,
+            price INTEGER NOT NULL,
+            status VARCHAR(20),
+            author_id INTEGER NOT NULL,
+            read_count INTEGER,
+            created_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY(author_id) REFERENCES user (id)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS community_post (
+            id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            created_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS demand (
+            id INTEGER NOT NULL,
+            title VARCHAR(100) NOT NULL,
+            description TEXT NOT NULL,
+            demand_type VARCHAR(20),
+            points_required INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            created_at DATETIME,
+            status VARCHAR(20),
+            contact_info VARCHAR(100),
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS "transaction" (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            document_id INTEGER,
+            amount INTEGER NOT NULL,
+            transaction_type VARCHAR(20),
+            description VARCHAR(100),
+            created_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES user (id),
+            FOREIGN KEY(document_id) REFERENCES document (id)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS comment (
+            id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            document_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            created_at DATETIME,
+            comment_type VARCHAR(20),
+            PRIMARY KEY (id),
+            FOREIGN KEY(document_id) REFERENCES document (id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    # 初始化系统统计（原先在 app.py 导入时检查）
+    conn.execute("""
+        INSERT INTO system_stats (total_points_created, total_fees_collected, total_rewards_given)
+        SELECT 0, 0, 0 WHERE NOT EXISTS (SELECT 1 FROM system_stats)""")
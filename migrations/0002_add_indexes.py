@@ -0,0 +1,14 @@
+"""为高频查询条件添加索引"""
+revision = 2
+
+
+def upgrade(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_document_status ON document (status)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_document_author_id ON document (author_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_transaction_user_document_type '
+                 'ON "transaction" (user_id, document_id, transaction_type)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_transaction_document_id ON "transaction" (document_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_comment_document_type ON comment (document_id, comment_type)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_comment_user_id ON comment (user_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_community_post_created_at ON community_post (created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_demand_status_created_at ON demand (status, created_at)')
@@ -0,0 +1,57 @@
+"""复式记账分录表、平台账户余额表及期初余额"""
+revision = 3
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_entry (
+            id INTEGER NOT NULL,
+            txn_id VARCHAR(32) NOT NULL,
+            account VARCHAR(40) NOT NULL,
+            user_id INTEGER,
+            document_id INTEGER,
+            amount INTEGER NOT NULL,
+            entry_type VARCHAR(20) NOT NULL,
+            description VARCHAR(100),
+            created_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES user (id),
+            FOREIGN KEY(document_id) REFERENCES document (id)
+        )""")
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_ledger_entry_txn_id ON ledger_entry (txn_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_ledger_entry_user_id ON ledger_entry (user_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_ledger_entry_account ON ledger_entry (account)')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS account_balance (
+            account VARCHAR(40) NOT NULL,
+            balance INTEGER NOT NULL,
+            updated_at DATETIME,
+            PRIMARY KEY (account)
+        )""")
+
+    # 期初余额：现有用户积分和手续费池都记为从系统发行账户转入
+    conn.execute("""
+        INSERT INTO ledger_entry (txn_id, account, user_id, amount, entry_type, description, created_at)
+        SELECT 'opening-' || id, 'user:' || id, id, points, 'opening', '期初余额', CURRENT_TIMESTAMP
+        FROM user WHERE COALESCE(points, 0) != 0""")
+    conn.execute("""
+        INSERT INTO ledger_entry (txn_id, account, user_id, amount, entry_type, description, created_at)
+        SELECT 'opening-' || id, 'system:issuance', NULL, -points, 'opening', '期初余额', CURRENT_TIMESTAMP
+        FROM user WHERE COALESCE(points, 0) != 0""")
+    conn.execute("""
+        INSERT INTO ledger_entry (txn_id, account, user_id, amount, entry_type, description, created_at)
+        SELECT 'opening-fee_pool', 'system:fee_pool', NULL, total_fees_collected, 'opening', '期初余额', CURRENT_TIMESTAMP
+        FROM system_stats WHERE COALESCE(total_fees_collected, 0) != 0 ORDER BY id LIMIT 1""")
+    conn.execute("""
+        INSERT INTO ledger_entry (txn_id, account, user_id, amount, entry_type, description, created_at)
+        SELECT 'opening-fee_pool', 'system:issuance', NULL, -total_fees_collected, 'opening', '期初余额', CURRENT_TIMESTAMP
+        FROM system_stats WHERE COALESCE(total_fees_collected, 0) != 0 ORDER BY id LIMIT 1""")
+    conn.execute("""
+        INSERT INTO account_balance (account, balance, updated_at)
+        SELECT account, SUM(amount), CURRENT_TIMESTAMP FROM ledger_entry
+        WHERE user_id IS NULL GROUP BY account""")
+    conn.execute("""
+        INSERT INTO account_balance (account, balance, updated_at)
+        SELECT a.account, 0, CURRENT_TIMESTAMP
+        FROM (SELECT 'system:issuance' AS account UNION ALL SELECT 'system:fee_pool') a
+        WHERE a.account NOT IN (SELECT account FROM account_balance)""")
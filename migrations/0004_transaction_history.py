@@ -0,0 +1,28 @@
+"""收支明细分页索引和用户月度汇总表"""
+revision = 4
+
+
+def upgrade(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_transaction_user_created '
+                 'ON "transaction" (user_id, created_at, id)')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transaction_rollup (
+            user_id INTEGER NOT NULL,
+            month VARCHAR(7) NOT NULL,
+            income INTEGER NOT NULL,
+            spend INTEGER NOT NULL,
+            fees INTEGER NOT NULL,
+            rewards INTEGER NOT NULL,
+            PRIMARY KEY (user_id, month),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    # 用已有的交易记录回填汇总
+    conn.execute("""
+        INSERT INTO transaction_rollup (user_id, month, income, spend, fees, rewards)
+        SELECT user_id, strftime('%Y-%m', created_at),
+               SUM(CASE WHEN transaction_type = 'read' THEN amount ELSE 0 END),
+               SUM(CASE WHEN transaction_type = 'purchase' THEN -amount ELSE 0 END),
+               SUM(CASE WHEN transaction_type = 'fee' THEN -amount ELSE 0 END),
+               SUM(CASE WHEN transaction_type IN ('reward', 'signup') THEN amount ELSE 0 END)
+        FROM "transaction"
+        GROUP BY user_id, strftime('%Y-%m', created_at)""")
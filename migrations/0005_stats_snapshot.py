@@ -0,0 +1,17 @@
+"""系统统计快照表"""
+revision = 5
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_snapshot (
+            id INTEGER NOT NULL,
+            users INTEGER NOT NULL,
+            approved_documents INTEGER NOT NULL,
+            points_in_circulation INTEGER NOT NULL,
+            total_points_created INTEGER NOT NULL,
+            total_fees_collected INTEGER NOT NULL,
+            total_rewards_given INTEGER NOT NULL,
+            refreshed_at DATETIME NOT NULL,
+            PRIMARY KEY (id)
+        )""")
@@ -0,0 +1,15 @@
+"""服务端会话表"""
+revision = 6
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS server_session (
+            id VARCHAR(64) NOT NULL,
+            user_id INTEGER,
+            data TEXT NOT NULL,
+            expires_at DATETIME NOT NULL,
+            PRIMARY KEY (id)
+        )""")
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_server_session_user_id ON server_session (user_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_server_session_expires_at ON server_session (expires_at)')
@@ -0,0 +1,11 @@
+"""社区动态分类状态和需求来源"""
+revision = 7
+
+
+def upgrade(conn):
+    conn.execute('ALTER TABLE community_post ADD COLUMN classified_at DATETIME')
+    conn.execute('ALTER TABLE demand ADD COLUMN source_post_id INTEGER REFERENCES community_post (id)')
+    # 已有动态在发布时已经同步识别过需求，标记为已分类，避免批量补处理时重复生成需求
+    conn.execute('UPDATE community_post SET classified_at = created_at')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_community_post_classified_at ON community_post (classified_at)')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS ix_demand_source_post_id ON demand (source_post_id)')
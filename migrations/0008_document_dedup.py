@@ -0,0 +1,22 @@
+"""文档查重索引（dedup.py）"""
+revision = 8
+
+
+def upgrade(conn):
+    conn.execute('ALTER TABLE document ADD COLUMN duplicate_of_id INTEGER REFERENCES document (id)')
+    conn.execute('ALTER TABLE document ADD COLUMN duplicate_score FLOAT')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS document_minhash (
+            document_id INTEGER NOT NULL,
+            signature BLOB NOT NULL,
+            PRIMARY KEY (document_id),
+            FOREIGN KEY (document_id) REFERENCES document (id)
+        )""")
+    # 主键以桶号开头，按桶号查候选时直接走主键
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS document_lsh (
+            bucket BIGINT NOT NULL,
+            document_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, document_id),
+            FOREIGN KEY (document_id) REFERENCES document (id)
+        )""")
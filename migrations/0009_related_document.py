@@ -0,0 +1,29 @@
+"""相关文档推荐（related.py）和定时任务水位"""
+revision = 9
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS related_document (
+            document_id INTEGER NOT NULL,
+            related_id INTEGER NOT NULL,
+            score FLOAT NOT NULL,
+            PRIMARY KEY (document_id, related_id),
+            FOREIGN KEY (document_id) REFERENCES document (id),
+            FOREIGN KEY (related_id) REFERENCES document (id)
+        )""")
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_related_document_related_id ON related_document (related_id)')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS related_document_state (
+            document_id INTEGER NOT NULL,
+            computed_at DATETIME NOT NULL,
+            PRIMARY KEY (document_id),
+            FOREIGN KEY (document_id) REFERENCES document (id)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS job_watermark (
+            name VARCHAR(50) NOT NULL,
+            value INTEGER NOT NULL,
+            updated_at DATETIME NOT NULL,
+            PRIMARY KEY (name)
+        )""")
@@ -0,0 +1,7 @@
+"""文档热度分数（ranking.py），由定时任务填充"""
+revision = 10
+
+
+def upgrade(conn):
+    conn.execute('ALTER TABLE document ADD COLUMN hot_score FLOAT')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_document_status_hot_score ON document (status, hot_score)')
@@ -0,0 +1,9 @@
+"""按创建时间导出用的索引（export.py 按 (created_at, id) 分块读取）"""
+revision = 11
+
+
+def upgrade(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_transaction_created_at ON "transaction" (created_at, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_ledger_entry_created_at ON ledger_entry (created_at, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_document_created_at ON document (created_at, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_demand_created_at ON demand (created_at, id)')
@@ -0,0 +1,39 @@
+"""交易和评论的归档表（archive.py），列与原表相同，另记归档时间"""
+revision = 12
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transaction_archive (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            document_id INTEGER,
+            amount INTEGER NOT NULL,
+            transaction_type VARCHAR(20),
+            description VARCHAR(100),
+            created_at DATETIME,
+            archived_at DATETIME NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES user (id),
+            FOREIGN KEY(document_id) REFERENCES document (id)
+        )""")
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_transaction_archive_user_document_type '
+                 'ON transaction_archive (user_id, document_id, transaction_type)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_transaction_archive_user_created '
+                 'ON transaction_archive (user_id, created_at, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_transaction_archive_document_id ON transaction_archive (document_id)')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS comment_archive (
+            id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            document_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            created_at DATETIME,
+            comment_type VARCHAR(20),
+            archived_at DATETIME NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(document_id) REFERENCES document (id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_comment_archive_document_created '
+                 'ON comment_archive (document_id, created_at, id)')
@@ -0,0 +1,17 @@
+"""幂等提交记录（idempotency.py）"""
+revision = 13
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_key (
+            user_id INTEGER NOT NULL,
+            "key" VARCHAR(32) NOT NULL,
+            status_code INTEGER,
+            headers VARCHAR(500),
+            body BLOB,
+            created_at DATETIME NOT NULL,
+            expires_at DATETIME NOT NULL,
+            PRIMARY KEY (user_id, "key")
+        )""")
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_idempotency_key_expires_at ON idempotency_key (expires_at)')
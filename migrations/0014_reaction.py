@@ -0,0 +1,26 @@
+"""点赞/差评从 comment 拆到 reaction 表，每个用户对每篇文档最多一条"""
+revision = 14
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reaction (
+            document_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            reaction_type VARCHAR(10),
+            updated_at DATETIME NOT NULL,
+            PRIMARY KEY (document_id, user_id),
+            FOREIGN KEY(document_id) REFERENCES document (id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_reaction_document_type ON reaction (document_id, reaction_type)')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_reaction_updated_at ON reaction (updated_at)')
+    # 已有的点赞/差评按 (文档, 用户) 去重，保留最后一次的类型，然后从 comment 中删除
+    conn.execute("""
+        INSERT OR IGNORE INTO reaction (document_id, user_id, reaction_type, updated_at)
+        SELECT c.document_id, c.user_id, c.comment_type, COALESCE(c.created_at, CURRENT_TIMESTAMP)
+        FROM comment c
+        JOIN (SELECT MAX(id) AS id FROM comment
+              WHERE comment_type IN ('like', 'dislike')
+              GROUP BY document_id, user_id) latest ON latest.id = c.id""")
+    conn.execute("DELETE FROM comment WHERE comment_type IN ('like', 'dislike')")
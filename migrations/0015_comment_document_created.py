@@ -0,0 +1,6 @@
+"""评论按文档分页的索引（history.comments_page）"""
+revision = 15
+
+
+def upgrade(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_comment_document_created ON comment (document_id, created_at, id)')
@@ -0,0 +1,6 @@
+"""社区动态分类出错时记录错误信息（classify.py）"""
+revision = 16
+
+
+def upgrade(conn):
+    conn.execute('ALTER TABLE community_post ADD COLUMN classify_error VARCHAR(200)')
@@ -0,0 +1,5 @@
+"""数据库迁移脚本
+
+每个文件 NNNN_说明.py 定义一个整数 revision 和 upgrade(conn) 函数，
+按 revision 顺序由 migrate.py 执行，已执行的版本号记录在 schema_version 表中。
+"""
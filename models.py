@@ -0,0 +1,263 @@
+from datetime import datetime
+
+from replicas import RoutingSQLAlchemy
+
+# 所有模块共用的数据库实例，由 app.py 通过 db.init_app(app) 绑定；
+# 配置只读副本时 @read_only 视图的查询走副本（见 replicas.py）
+db = RoutingSQLAlchemy()
+
+# 数据库模型
+# 表结构变更请在 migrations/ 下新增迁移文件，并保持这里的定义与迁移结果一致
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password = db.Column(db.String(120), nullable=False)
+    points = db.Column(db.Integer, default=100)  # 注册赠送100分
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Document(db.Model):
+    __table_args__ = (
+        db.Index('ix_document_status', 'status'),
+        db.Index('ix_document_author_id', 'author_id'),
+        db.Index('ix_document_status_hot_score', 'status', 'hot_score'),
+        db.Index('ix_document_created_at', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    price = db.Column(db.Integer, nullable=False)  # 阅读价格（≥100分）
+    status = db.Column(db.String(20), default='pending')  # pending/approved/rejected
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    read_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('document.id'))  # 提交时发现的疑似重复文档（dedup.py）
+    duplicate_score = db.Column(db.Float)  # 与疑似重复文档的估算相似度
+    hot_score = db.Column(db.Float)  # 热度分数，由定时任务刷新（ranking.py），为空表示尚未计算
+    author = db.relationship('User', backref=db.backref('documents', lazy=True))
+
+class Transaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_transaction_user_document_type', 'user_id', 'document_id', 'transaction_type'),
+        db.Index('ix_transaction_document_id', 'document_id'),
+        db.Index('ix_transaction_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_transaction_created_at', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'))
+    amount = db.Column(db.Integer, nullable=False)
+    transaction_type = db.Column(db.String(20))  # purchase/read/fee/reward/signup (避免使用type关键字)
+    description = db.Column(db.String(100))  # 交易描述
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User', backref=db.backref('transactions', lazy=True))
+
+# 归档的旧交易（archive.py），id 与原表一致
+class TransactionArchive(db.Model):
+    __table_args__ = (
+        db.Index('ix_transaction_archive_user_document_type', 'user_id', 'document_id', 'transaction_type'),
+        db.Index('ix_transaction_archive_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_transaction_archive_document_id', 'document_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'))
+    amount = db.Column(db.Integer, nullable=False)
+    transaction_type = db.Column(db.String(20))
+    description = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# 用户月度收支汇总，随 Transaction 写入增量更新（金额均为正数）
+class TransactionRollup(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    income = db.Column(db.Integer, nullable=False, default=0)  # 文档收入
+    spend = db.Column(db.Integer, nullable=False, default=0)  # 购买支出
+    fees = db.Column(db.Integer, nullable=False, default=0)  # 手续费
+    rewards = db.Column(db.Integer, nullable=False, default=0)  # 奖励和赠送
+
+# 复式记账分录：积分变动的唯一依据，只追加不修改
+# 同一笔业务的各条分录共用 txn_id，金额合计必须为0
+class LedgerEntry(db.Model):
+    __table_args__ = (
+        db.Index('ix_ledger_entry_txn_id', 'txn_id'),
+        db.Index('ix_ledger_entry_user_id', 'user_id'),
+        db.Index('ix_ledger_entry_account', 'account'),
+        db.Index('ix_ledger_entry_created_at', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    txn_id = db.Column(db.String(32), nullable=False)
+    account = db.Column(db.String(40), nullable=False)  # user:<id> / system:issuance / system:fee_pool
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # 用户账户冗余存一份，便于按用户汇总
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'))
+    amount = db.Column(db.Integer, nullable=False)
+    entry_type = db.Column(db.String(20), nullable=False)
+    description = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# 平台账户余额（用户余额物化在 User.points），与分录在同一事务中更新
+class AccountBalance(db.Model):
+    account = db.Column(db.String(40), primary_key=True)
+    balance = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# 评论模型（修复字段名冲突）
+class Comment(db.Model):
+    __table_args__ = (
+        db.Index('ix_comment_document_type', 'document_id', 'comment_type'),
+        db.Index('ix_comment_document_created', 'document_id', 'created_at', 'id'),
+        db.Index('ix_comment_user_id', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    content = db.Column(db.Text, nullable=False, default='')  # 添加默认值
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 评论类型：comment-普通评论（点赞/差评已移到 Reaction，避免使用type关键字）
+    comment_type = db.Column(db.String(20), default='comment')
+
+    user = db.relationship('User', backref=db.backref('comments', lazy=True))
+    document = db.relationship('Document', backref=db.backref('comments', lazy=True))
+
+# 归档的旧评论（archive.py），id 与原表一致
+class CommentArchive(db.Model):
+    __table_args__ = (
+        db.Index('ix_comment_archive_document_created', 'document_id', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    content = db.Column(db.Text, nullable=False, default='')
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    comment_type = db.Column(db.String(20))
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# 点赞/差评：每个用户对每篇文档一条，再次点击同一类型时取消（reaction_type 置空），见 reactions.py
+class Reaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_reaction_document_type', 'document_id', 'reaction_type'),
+        db.Index('ix_reaction_updated_at', 'updated_at'),
+    )
+
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    reaction_type = db.Column(db.String(10))  # like/dislike，为空表示已取消
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# 社区动态模型
+class CommunityPost(db.Model):
+    __table_args__ = (
+        db.Index('ix_community_post_created_at', 'created_at'),
+        db.Index('ix_community_post_classified_at', 'classified_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    content = db.Column(db.Text, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    classified_at = db.Column(db.DateTime)  # 后台分类完成时间，为空表示待处理（classify.py）
+    classify_error = db.Column(db.String(200))  # 分类处理出错时的错误信息，为空表示正常
+    user = db.relationship('User', backref=db.backref('community_posts', lazy=True))
+
+# 系统统计表
+class SystemStats(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    total_points_created = db.Column(db.Integer, default=0)  # 系统创建的总积分
+    total_fees_collected = db.Column(db.Integer, default=0)  # 收取的总手续费
+    total_rewards_given = db.Column(db.Integer, default=0)  # 发放的总奖励
+
+# 系统统计快照：由定时任务 stats.refresh_snapshot() 整表重算，统计页面只读这一行
+class StatsSnapshot(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    users = db.Column(db.Integer, nullable=False, default=0)
+    approved_documents = db.Column(db.Integer, nullable=False, default=0)
+    points_in_circulation = db.Column(db.Integer, nullable=False, default=0)
+    total_points_created = db.Column(db.Integer, nullable=False, default=0)
+    total_fees_collected = db.Column(db.Integer, nullable=False, default=0)
+    total_rewards_given = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# 服务端会话（sessions.py），cookie 中只保存 id
+class ServerSession(db.Model):
+    __table_args__ = (
+        db.Index('ix_server_session_user_id', 'user_id'),
+        db.Index('ix_server_session_expires_at', 'expires_at'),
+    )
+
+    id = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer)  # 已登录会话的用户，用于一键退出所有设备
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+# 幂等提交记录（idempotency.py）：key 为幂等键和请求内容的摘要，status_code 为空表示第一次请求还在执行
+class IdempotencyKey(db.Model):
+    __table_args__ = (
+        db.Index('ix_idempotency_key_expires_at', 'expires_at'),
+    )
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    key = db.Column(db.String(32), primary_key=True)
+    status_code = db.Column(db.Integer)
+    headers = db.Column(db.String(500))
+    body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+# 文档查重索引（dedup.py）：MinHash 签名和 LSH 分桶
+class DocumentMinHash(db.Model):
+    __tablename__ = 'document_minhash'
+
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)
+
+class DocumentLsh(db.Model):
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True, autoincrement=False)
+
+# 相关文档推荐（related.py）：由定时任务预先计算，详情页按 document_id 读取
+class RelatedDocument(db.Model):
+    __table_args__ = (
+        db.Index('ix_related_document_related_id', 'related_id'),
+    )
+
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True, autoincrement=False)
+    related_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True, autoincrement=False)
+    score = db.Column(db.Float, nullable=False)
+
+# 已计算过相关文档的文档及计算时间，没有记录的已批准文档由下次任务补算
+class RelatedDocumentState(db.Model):
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True, autoincrement=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+# 增量定时任务的处理进度（例如已处理到的交易 id）
+class JobWatermark(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# 需求模型
+class Demand(db.Model):
+    __table_args__ = (
+        db.Index('ix_demand_status_created_at', 'status', 'created_at'),
+        db.Index('ix_demand_source_post_id', 'source_post_id', unique=True),
+        db.Index('ix_demand_created_at', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    demand_type = db.Column(db.String(20))  # service/parts
+    points_required = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default='active')  # active/completed
+    contact_info = db.Column(db.String(100))
+    source_post_id = db.Column(db.Integer, db.ForeignKey('community_post.id'))  # 由社区动态识别生成时的来源
+
+    user = db.relationship('User', backref=db.backref('demands', lazy=True))
@@ -0,0 +1,45 @@
+"""按路由统计 SQL 查询次数
+
+在视图上加 @limit_queries(n) 声明该路由允许执行的最大查询数，
+每个请求结束时比较实际执行的查询次数：
+- 默认超出时记录警告日志
+- app.config['QUERY_BUDGET_STRICT'] = True 时直接抛出 AssertionError（用于检查脚本）
+
+响应头 X-Query-Count 返回本次请求的查询次数，方便压测和排查 N+1 查询。
+"""
+import functools
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def limit_queries(limit):
+    """声明路由的查询预算"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g.query_budget = limit
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    @app.after_request
+    def check_query_budget(response):
+        count = g.get('query_count', 0)
+        response.headers['X-Query-Count'] = str(count)
+        limit = g.get('query_budget')
+        if limit is not None and count > limit:
+            message = f"{request.endpoint} 执行了 {count} 次查询，超出预算 {limit}"
+            if app.config.get('QUERY_BUDGET_STRICT'):
+                raise AssertionError(message)
+            app.logger.warning(message)
+        return response
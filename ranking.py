@@ -0,0 +1,131 @@
+"""文档热度排名
+
+列表页按热度排序时只读 Document.hot_score，走 (status, hot_score) 索引，
+分数由定时任务（tasks.py）增量刷新，请求中不聚合评论和交易：
+
+- 每个事件按发生时间指数衰减，每过 HOT_HALF_LIFE_HOURS 小时权重减半：
+  发布（BASE_WEIGHT）、累计阅读量（READ_WEIGHT * read_count，按发布时间计）、
+  点赞（LIKE_WEIGHT）、差评（DISLIKE_WEIGHT，为负）、购买（PURCHASE_WEIGHT）
+- 分数以固定时间点 EPOCH 为基准取对数：hot_score = log2(Σ 权重 * 2^((事件时间 - EPOCH) / 半衰期))，
+  所有文档的分数随时间等比例衰减，排序不变，所以没有新事件的文档不需要重算
+- 每次只重算上次运行之后有点赞/差评变化（job_watermark 记录的时间之后，含取消）或有新购买（记录的交易 id 之后）的文档，
+  以及还没有分数的文档；阅读量随购买增加，会一起重算
+- updated_at 在请求中取值、提交在后，提交较慢的变化可能早于记录的时间，所以点赞/差评从记录的时间
+  往前 REACTION_WATERMARK_MARGIN_SECONDS 秒开始查，这段时间内的变化会多算一次，不会漏
+
+全部重算：python ranking.py --full
+"""
+import calendar
+import math
+import os
+from datetime import datetime
+
+from models import db, Document, Reaction, Transaction, JobWatermark
+
+HOT_HALF_LIFE_HOURS = float(os.environ.get('HOT_HALF_LIFE_HOURS', 72))
+EPOCH = datetime(2024, 1, 1)
+
+BASE_WEIGHT = 1.0
+READ_WEIGHT = 0.1
+LIKE_WEIGHT = 3.0
+DISLIKE_WEIGHT = -3.0
+PURCHASE_WEIGHT = 5.0
+# 差评多于好评时，分数最低为发布时刻基础分的 1/1024
+MIN_SCORE_OFFSET = -10
+
+REACTION_WATERMARK = 'hot_score.reaction'  # 值为 UTC 秒级时间戳
+REACTION_WATERMARK_MARGIN_SECONDS = int(os.environ.get('REACTION_WATERMARK_MARGIN_SECONDS', 300))
+TRANSACTION_WATERMARK = 'hot_score.transaction'
+
+# 列表页按热度排序
+HOT_ORDER = (Document.hot_score.desc(), Document.id.desc())
+
+
+def _half_lives(when):
+    return (when - EPOCH).total_seconds() / 3600 / HOT_HALF_LIFE_HOURS
+
+
+def hot_score(created_at, read_count, events):
+    """events 为 [(权重, 发生时间)]，返回对数形式的衰减分数"""
+    created = _half_lives(created_at)
+    terms = [(BASE_WEIGHT + READ_WEIGHT * (read_count or 0), created)]
+    terms += [(weight, _half_lives(when)) for weight, when in events]
+    top = max(exponent for _, exponent in terms)
+    mass = sum(weight * 2 ** (exponent - top) for weight, exponent in terms)
+    floor = created + MIN_SCORE_OFFSET
+    return max(top + math.log2(mass), floor) if mass > 0 else floor
+
+
+def _watermark(name):
+    return db.session.query(JobWatermark.value).filter_by(name=name).scalar() or 0
+
+
+def _set_watermark(name, value):
+    db.session.merge(JobWatermark(name=name, value=value, updated_at=datetime.utcnow()))
+
+
+def _events(doc_ids):
+    events = {doc_id: [] for doc_id in doc_ids}
+    weights = {'like': LIKE_WEIGHT, 'dislike': DISLIKE_WEIGHT}
+    reactions = db.session.query(Reaction.document_id, Reaction.reaction_type, Reaction.updated_at) \
+        .filter(Reaction.document_id.in_(doc_ids), Reaction.reaction_type.in_(weights))
+    for document_id, reaction_type, updated_at in reactions:
+        events[document_id].append((weights[reaction_type], updated_at))
+    purchases = db.session.query(Transaction.document_id, Transaction.created_at) \
+        .filter(Transaction.document_id.in_(doc_ids), Transaction.transaction_type == 'purchase')
+    for document_id, created_at in purchases:
+        events[document_id].append((PURCHASE_WEIGHT, created_at))
+    return events
+
+
+def _changed(reaction_after, transaction_after):
+    """点赞/差评有变化、有新购买的文档，以及还没有分数的文档"""
+    changed = {doc_id for doc_id, in db.session.query(Document.id).filter(Document.hot_score.is_(None))}
+    since = datetime.utcfromtimestamp(max(reaction_after - REACTION_WATERMARK_MARGIN_SECONDS, 0))
+    changed.update(doc_id for doc_id, in db.session.query(Reaction.document_id).distinct()
+                   .filter(Reaction.updated_at >= since))
+    changed.update(doc_id for doc_id, in db.session.query(Transaction.document_id).distinct()
+                   .filter(Transaction.id > transaction_after, Transaction.transaction_type == 'purchase',
+                           Transaction.document_id.isnot(None)))
+    return changed
+
+
+def refresh(full=False, batch_size=500):
+    """重算有变化的文档的热度分数，返回重算的文档数"""
+    # 先记下水位再读事件，期间新增的事件下次还会再算一次，不会漏
+    started = calendar.timegm(datetime.utcnow().timetuple())
+    max_transaction_id = db.session.query(db.func.max(Transaction.id)).scalar() or 0
+    if full:
+        doc_ids = sorted(doc_id for doc_id, in db.session.query(Document.id))
+    else:
+        doc_ids = sorted(_changed(_watermark(REACTION_WATERMARK), _watermark(TRANSACTION_WATERMARK)))
+
+    table = Document.__table__
+    for start in range(0, len(doc_ids), batch_size):
+        chunk = doc_ids[start:start + batch_size]
+        events = _events(chunk)
+        documents = db.session.query(Document.id, Document.created_at, Document.read_count) \
+            .filter(Document.id.in_(chunk)).all()
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('doc_id')).values(hot_score=db.bindparam('score')),
+            [{'doc_id': doc_id, 'score': hot_score(created_at, read_count, events[doc_id])}
+             for doc_id, created_at, read_count in documents])
+        db.session.commit()
+    _set_watermark(REACTION_WATERMARK, started)
+    _set_watermark(TRANSACTION_WATERMARK, max_transaction_id)
+    db.session.commit()
+    return len(doc_ids)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description='重算文档热度分数')
+    parser.add_argument('--full', action='store_true', help='全部重算')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    with app.app_context():
+        print(f"已重算 {refresh(args.full, args.batch_size)} 篇文档的热度分数")
@@ -0,0 +1,57 @@
+"""点赞/差评
+
+每个用户对每篇文档最多一条 reaction 记录（主键 (document_id, user_id)），点击时一条 upsert 语句完成切换：
+
+- 没有记录时插入
+- 再次点击同一类型时取消：reaction_type 置空，记录保留，热度任务（ranking.py）按 updated_at 发现变化
+- 点赞 ↔ 差评原地切换
+"""
+from datetime import datetime
+
+from models import db, Document, Reaction
+
+REACTION_TYPES = ('like', 'dislike')
+
+_TOGGLE = db.text("""
+    INSERT INTO reaction (document_id, user_id, reaction_type, updated_at)
+    VALUES (:document_id, :user_id, :reaction_type, :now)
+    ON CONFLICT (document_id, user_id) DO UPDATE SET
+        reaction_type = CASE WHEN reaction.reaction_type = excluded.reaction_type
+                             THEN NULL ELSE excluded.reaction_type END,
+        updated_at = excluded.updated_at""")
+
+
+def toggle(document_id, user_id, reaction_type):
+    """在当前事务中切换点赞/差评，返回切换后的类型（None 表示已取消）"""
+    if reaction_type not in REACTION_TYPES:
+        raise ValueError(f'未知的类型: {reaction_type}')
+    db.session.execute(_TOGGLE, {'document_id': document_id, 'user_id': user_id,
+                                 'reaction_type': reaction_type, 'now': datetime.utcnow()})
+    return user_reaction(document_id, user_id)
+
+
+def user_reaction(document_id, user_id):
+    """用户对文档的当前态度：'like'、'dislike' 或 None（主键查询）"""
+    return db.session.query(Reaction.reaction_type) \
+        .filter_by(document_id=document_id, user_id=user_id).scalar()
+
+
+def counts_select(doc_ids):
+    """各文档点赞、差评数的分组查询，列为 (document_id, comment_type, count)，可与评论计数 UNION；
+    doc_ids 为 id 列表或返回文档 id 的子查询"""
+    table = Reaction.__table__
+    return db.select([table.c.document_id, table.c.reaction_type.label('comment_type'), db.func.count().label('count')]) \
+        .where(db.and_(table.c.document_id.in_(doc_ids), table.c.reaction_type.isnot(None))) \
+        .group_by(table.c.document_id, table.c.reaction_type)
+
+
+def changed_at_subquery(document_id):
+    """文档最近一次点赞/差评变化的时间，供详情页 ETag 使用"""
+    return db.select([db.func.max(Reaction.updated_at)]).where(Reaction.document_id == document_id).as_scalar()
+
+
+def likes_received(author_id):
+    """作者全部文档收到的点赞数"""
+    return db.session.query(db.func.count()).select_from(Reaction) \
+        .join(Document, Reaction.document_id == Document.id) \
+        .filter(Document.author_id == author_id, Reaction.reaction_type == 'like').scalar()
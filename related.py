@@ -0,0 +1,228 @@
+"""相关文档推荐（离线计算）
+
+详情页展示的相关文档由定时任务（tasks.py）预先算好写入 related_document，
+页面只按文档 id 读取前 RELATED_TOP_K 条，请求中不做任何计算：
+
+- 文本相似度：标题和正文的字符 2~3 元组 TF-IDF，余弦相似度
+- 共同购买：同时购买过两篇文档的用户数（含已归档的交易），按两篇各自的购买人数做余弦归一化
+- 得分 = TEXT_WEIGHT * 文本相似度 + PURCHASE_WEIGHT * 共同购买，低于 MIN_SCORE 的不推荐
+
+每次只重算有变化的文档，没有变化时不加载语料：
+
+- 新批准的文档（related_document_state 中没有记录），以及得分能挤进现有前 K 名的其他文档
+- 上次运行之后（job_watermark 记录的交易 id 之后）有新购买的用户，他们买过的所有文档
+- 不再是已批准状态的文档：删除它的推荐，并重算推荐列表中包含它的文档
+
+TF-IDF 每次按当前全部已批准文档重新拟合，未重算的文档得分会与最新语料略有出入，
+需要时可全部重算：
+
+    python related.py --full
+"""
+import os
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import archive
+from models import db, Document, Transaction, RelatedDocument, RelatedDocumentState, JobWatermark
+
+RELATED_TOP_K = int(os.environ.get('RELATED_TOP_K', 5))
+TEXT_WEIGHT = 0.6
+PURCHASE_WEIGHT = 0.4
+MIN_SCORE = 0.05
+MAX_FEATURES = 200000
+WATERMARK = 'related_documents'
+
+
+# ========== 读取 ==========
+
+def for_document(doc_id, limit=RELATED_TOP_K):
+    """详情页使用：返回已批准的相关文档 [(id, title, price, read_count)]，按得分倒序"""
+    return db.session.query(Document.id, Document.title, Document.price, Document.read_count) \
+        .join(RelatedDocument, RelatedDocument.related_id == Document.id) \
+        .filter(RelatedDocument.document_id == doc_id, Document.status == 'approved') \
+        .order_by(RelatedDocument.score.desc()).limit(limit).all()
+
+
+def computed_at_subquery(doc_id):
+    """文档相关推荐的计算时间，供详情页 ETag 使用"""
+    return db.select([RelatedDocumentState.computed_at]) \
+        .where(RelatedDocumentState.document_id == doc_id).as_scalar()
+
+
+# ========== 计算 ==========
+
+def _watermark():
+    return db.session.query(JobWatermark.value).filter_by(name=WATERMARK).scalar() or 0
+
+
+def _set_watermark(value):
+    db.session.merge(JobWatermark(name=WATERMARK, value=value, updated_at=datetime.utcnow()))
+
+
+def _purchases(buyers=None):
+    """(用户, 文档) 购买记录，含已归档的交易；buyers 为限定用户的子查询"""
+    def build(table):
+        query = db.select([table.c.user_id, table.c.document_id]) \
+            .where(table.c.transaction_type == 'purchase').distinct()
+        return query if buyers is None else query.where(table.c.user_id.in_(buyers))
+    rows = archive.union('transaction', build)
+    return db.session.execute(db.select([rows.c.user_id, rows.c.document_id]).distinct()).fetchall()
+
+
+def _purchased_by_new_buyers(after_id):
+    """交易 id 大于 after_id 的购买涉及的用户，他们购买过的所有文档"""
+    buyers = db.select([Transaction.user_id]) \
+        .where(db.and_(Transaction.transaction_type == 'purchase', Transaction.id > after_id))
+    return {document_id for _, document_id in _purchases(buyers)}
+
+
+def _chunks(items, size=500):
+    items = sorted(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _referencing(doc_ids):
+    """推荐列表中包含 doc_ids 的文档"""
+    referencing = set()
+    for chunk in _chunks(doc_ids):
+        rows = db.session.query(RelatedDocument.document_id).distinct() \
+            .filter(RelatedDocument.related_id.in_(chunk)).all()
+        referencing.update(document_id for document_id, in rows)
+    return referencing
+
+
+def _kth_scores():
+    """每篇文档进入其推荐列表所需的最低得分：列表已满时为第 K 名的得分"""
+    rows = db.session.query(RelatedDocument.document_id, db.func.count(), db.func.min(RelatedDocument.score)) \
+        .group_by(RelatedDocument.document_id).all()
+    return {document_id: score for document_id, count, score in rows if count >= RELATED_TOP_K}
+
+
+class Corpus:
+    """全部已批准文档的 TF-IDF 矩阵和用户-文档购买矩阵，行/列按 ids 排列"""
+
+    def __init__(self, ids, texts, purchases):
+        self.ids = np.asarray(ids)
+        self.index = {doc_id: i for i, doc_id in enumerate(ids)}
+        vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 3), max_features=MAX_FEATURES,
+                                     sublinear_tf=True, dtype=np.float32)
+        self.text = vectorizer.fit_transform(texts)  # 每行已做 L2 归一化，点积即余弦相似度
+        users = {}
+        rows, cols = [], []
+        for user_id, document_id in purchases:
+            if document_id in self.index:
+                rows.append(users.setdefault(user_id, len(users)))
+                cols.append(self.index[document_id])
+        self.bought = sparse.csc_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                        shape=(len(users), len(ids)))
+        self.buyers = np.asarray(self.bought.sum(axis=0), dtype=np.float32).ravel()
+
+    @classmethod
+    def load(cls):
+        documents = db.session.query(Document.id, Document.title, Document.content) \
+            .filter(Document.status == 'approved').order_by(Document.id).all()
+        return cls([d.id for d in documents], [f'{d.title}\n{d.content}' for d in documents], _purchases())
+
+    def scores(self, doc_ids):
+        """doc_ids 中每篇文档与全部文档的得分，返回 (len(doc_ids), len(ids)) 的数组"""
+        rows = [self.index[doc_id] for doc_id in doc_ids]
+        text = (self.text[rows] @ self.text.T).toarray()
+        together = (self.bought[:, rows].T @ self.bought).toarray()
+        norm = np.sqrt(np.outer(self.buyers[rows], self.buyers))
+        purchase = np.divide(together, norm, out=np.zeros_like(together), where=norm > 0)
+        scores = TEXT_WEIGHT * text + PURCHASE_WEIGHT * purchase
+        scores[np.arange(len(rows)), rows] = 0  # 不推荐自己
+        return scores
+
+    def top_k(self, row, k=RELATED_TOP_K):
+        candidates = np.nonzero(row >= MIN_SCORE)[0]
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-row[candidates], k)[:k]]
+        candidates = candidates[np.argsort(-row[candidates])]
+        return [(int(self.ids[j]), float(row[j])) for j in candidates]
+
+
+def _save(results, now):
+    doc_ids = list(results)
+    related = RelatedDocument.__table__
+    state = RelatedDocumentState.__table__
+    db.session.execute(related.delete().where(related.c.document_id.in_(doc_ids)))
+    db.session.execute(state.delete().where(state.c.document_id.in_(doc_ids)))
+    rows = [{'document_id': doc_id, 'related_id': related_id, 'score': score}
+            for doc_id, items in results.items() for related_id, score in items]
+    if rows:
+        db.session.execute(related.insert(), rows)
+    db.session.execute(state.insert(), [{'document_id': doc_id, 'computed_at': now} for doc_id in doc_ids])
+
+
+def _remove(doc_ids):
+    related = RelatedDocument.__table__
+    state = RelatedDocumentState.__table__
+    for chunk in _chunks(doc_ids):
+        db.session.execute(related.delete().where(related.c.document_id.in_(chunk)))
+        db.session.execute(state.delete().where(state.c.document_id.in_(chunk)))
+
+
+def refresh(full=False, batch_size=200):
+    """重算有变化的文档的相关推荐，返回重算的文档数"""
+    max_transaction_id = db.session.query(db.func.max(Transaction.id)).scalar() or 0
+    approved = {doc_id for doc_id, in db.session.query(Document.id).filter(Document.status == 'approved')}
+    computed = {doc_id for doc_id, in db.session.query(RelatedDocumentState.document_id)}
+    new = approved - computed
+    removed = computed - approved
+    if full:
+        dirty = set(approved)
+    else:
+        dirty = new | _purchased_by_new_buyers(_watermark())
+        if removed:
+            dirty |= _referencing(removed)
+        dirty &= approved
+    if removed:
+        _remove(removed)
+    if not dirty:
+        _set_watermark(max_transaction_id)
+        db.session.commit()
+        return 0
+
+    corpus = Corpus.load()
+    kth = _kth_scores()
+    pending = sorted(dirty)
+    queued = set(pending)
+    refreshed = 0
+    now = datetime.utcnow()
+    while pending:
+        chunk, pending = pending[:batch_size], pending[batch_size:]
+        results = {}
+        for doc_id, row in zip(chunk, corpus.scores(chunk)):
+            results[doc_id] = corpus.top_k(row)
+            if doc_id in new:
+                # 得分是对称的：新文档能挤进哪些文档的前 K 名，就要重算哪些文档
+                for j in np.nonzero(row >= MIN_SCORE)[0]:
+                    other = int(corpus.ids[j])
+                    if other not in queued and row[j] > kth.get(other, MIN_SCORE):
+                        queued.add(other)
+                        pending.append(other)
+        _save(results, now)
+        db.session.commit()
+        refreshed += len(results)
+    _set_watermark(max_transaction_id)
+    db.session.commit()
+    return refreshed
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description='重算相关文档推荐')
+    parser.add_argument('--full', action='store_true', help='全部重算')
+    parser.add_argument('--batch-size', type=int, default=200)
+    args = parser.parse_args()
+
+    with app.app_context():
+        print(f"已重算 {refresh(args.full, args.batch_size)} 篇文档的相关推荐")
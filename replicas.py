@@ -0,0 +1,90 @@
+"""只读副本路由
+
+设置 REPLICA_DATABASE_URL（例如 sqlite:///forklift-replica.db，或数据库只读副本的地址）后，
+加了 @read_only 的视图中 db.session 的查询改走副本，其余情况仍使用主库：
+
+- 写入（flush、insert/update/delete、非 SELECT 的文本 SQL）始终走主库，即使发生在只读视图中
+- 读己之写：请求中向主库写入过数据后，该会话在 REPLICA_STICKY_SECONDS 秒内的只读视图也走主库，
+  用户刚提交的内容不会因为副本延迟而“消失”
+- 未配置副本时 @read_only 不起作用
+
+副本为 SQLite 文件时，由 tasks.py 每 REPLICA_SYNC_SECONDS 秒用在线备份接口从主库刷新一次
+（backup.refresh_replica），REPLICA_STICKY_SECONDS 默认取两个同步周期。
+"""
+import functools
+import os
+import time
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import orm
+from sqlalchemy.sql.expression import TextClause, UpdateBase
+
+REPLICA_BIND = 'replica'
+REPLICA_SYNC_SECONDS = int(os.environ.get('REPLICA_SYNC_SECONDS', 60))
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', REPLICA_SYNC_SECONDS * 2))
+STICKY_SESSION_KEY = '_primary_until'
+
+
+def _is_write(clause):
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip().upper().startswith(('SELECT', 'WITH'))
+    return False
+
+
+class RoutingSession(SignallingSession):
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or _is_write(clause):
+            if has_request_context():
+                g.wrote_primary = True
+        elif has_request_context() and g.get('use_replica'):
+            return self.db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def replica_configured(app):
+    return bool((app.config.get('SQLALCHEMY_BINDS') or {}).get(REPLICA_BIND))
+
+
+def replica_path(app):
+    """副本为 SQLite 文件时返回文件路径，否则（未配置或由数据库自身复制）返回 None"""
+    if not replica_configured(app):
+        return None
+    # 相对路径由 Flask-SQLAlchemy 按应用目录解析，取引擎上的地址
+    url = app.extensions['sqlalchemy'].db.get_engine(app, bind=REPLICA_BIND).url
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        return None
+    return url.database
+
+
+def init_app(app):
+    uri = app.config.setdefault('REPLICA_DATABASE_URL', os.environ.get('REPLICA_DATABASE_URL'))
+    if uri:
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, **{REPLICA_BIND: uri})
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('wrote_primary') and 'user_id' in session and replica_configured(app):
+            session[STICKY_SESSION_KEY] = time.time() + REPLICA_STICKY_SECONDS
+        return response
+
+
+def read_only(view):
+    """视图中的查询走只读副本（该会话最近写入过时仍走主库）"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if replica_configured(current_app) and session.get(STICKY_SESSION_KEY, 0) < time.time():
+            g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,279 @@
+"""服务端会话
+
+Cookie 中只保存一个随机的会话 id（用 SECRET_KEY 签名，签名不符的 cookie 视为没有会话），
+会话内容存放在服务端，可以随时作废：
+
+- SESSION_BACKEND=sql（默认）：存放在 server_session 表
+- SESSION_BACKEND=redis：存放在 SESSION_REDIS_URL 指向的 Redis，过期由 Redis 处理
+
+每个进程在内存中用 LRU 缓存最近使用的会话（SESSION_CACHE_SIZE 个，最长 SESSION_CACHE_SECONDS 秒），
+命中缓存的请求不访问存储。在其他进程中作废的会话最迟在缓存过期后失效。
+
+会话内容没有变化时不写存储；剩余有效期不足一半时才顺延过期时间。
+过期会话由 tasks.py 定时调用 purge_expired() 批量删除。
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from models import db, ServerSession
+
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 10000))
+SESSION_CACHE_SECONDS = float(os.environ.get('SESSION_CACHE_SECONDS', 5))
+
+serializer = TaggedJSONSerializer()
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.new = new
+        self.modified = False
+        self.rotate = False
+
+
+def regenerate(session):
+    """登录后更换会话 id，防止会话固定攻击"""
+    session.rotate = True
+    session.modified = True
+
+
+# ========== 存储 ==========
+
+class SqlSessionStore:
+    """server_session 表，直接使用独立连接，不影响请求中 db.session 的事务"""
+    table = ServerSession.__table__
+
+    def load(self, sid):
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                db.select([self.table.c.data, self.table.c.expires_at])
+                .where(self.table.c.id == sid)).first()
+        if row is None or row.expires_at <= datetime.utcnow():
+            return None
+        return row.data, row.expires_at
+
+    def save(self, sid, data, user_id, expires_at):
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                self.table.update().where(self.table.c.id == sid)
+                .values(data=data, user_id=user_id, expires_at=expires_at))
+            if result.rowcount != 1:
+                conn.execute(self.table.insert().values(
+                    id=sid, data=data, user_id=user_id, expires_at=expires_at))
+
+    def delete(self, sid):
+        with db.engine.begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.id == sid))
+
+    def delete_user(self, user_id):
+        """删除用户的全部会话，返回删除的 id 列表"""
+        with db.engine.begin() as conn:
+            sids = [row.id for row in conn.execute(
+                db.select([self.table.c.id]).where(self.table.c.user_id == user_id))]
+            conn.execute(self.table.delete().where(self.table.c.user_id == user_id))
+        return sids
+
+    def purge_expired(self, batch_size=5000):
+        """分批删除过期会话，避免长时间锁表，返回删除数量"""
+        deleted = 0
+        with db.engine.connect() as conn:
+            while True:
+                with conn.begin():
+                    expired = db.select([self.table.c.id]) \
+                        .where(self.table.c.expires_at < datetime.utcnow()).limit(batch_size)
+                    count = conn.execute(self.table.delete().where(self.table.c.id.in_(expired))).rowcount
+                deleted += count
+                if count < batch_size:
+                    return deleted
+
+
+class RedisSessionStore:
+    """会话存为 session:<id>，用户的会话 id 集合存为 user_sessions:<user_id>"""
+
+    def __init__(self, url):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+
+    def load(self, sid):
+        with self.redis.pipeline() as pipe:
+            pipe.get(f'session:{sid}')
+            pipe.ttl(f'session:{sid}')
+            data, ttl = pipe.execute()
+        if data is None:
+            return None
+        return data.decode(), datetime.utcnow() + timedelta(seconds=max(ttl, 0))
+
+    def save(self, sid, data, user_id, expires_at):
+        seconds = max(1, int((expires_at - datetime.utcnow()).total_seconds()))
+        with self.redis.pipeline() as pipe:
+            pipe.setex(f'session:{sid}', seconds, data)
+            if user_id is not None:
+                pipe.sadd(f'user_sessions:{user_id}', sid)
+                pipe.expire(f'user_sessions:{user_id}', seconds)
+            pipe.execute()
+
+    def delete(self, sid):
+        self.redis.delete(f'session:{sid}')
+
+    def delete_user(self, user_id):
+        key = f'user_sessions:{user_id}'
+        sids = [sid.decode() for sid in self.redis.smembers(key)]
+        if sids:
+            self.redis.delete(*[f'session:{sid}' for sid in sids])
+        self.redis.delete(key)
+        return sids
+
+    def purge_expired(self, batch_size=5000):
+        return 0  # Redis 按 TTL 自动过期
+
+
+def create_store(app):
+    backend = app.config.get('SESSION_BACKEND', 'sql')
+    if backend == 'redis':
+        return RedisSessionStore(app.config['SESSION_REDIS_URL'])
+    if backend == 'sql':
+        return SqlSessionStore()
+    raise ValueError(f'未知的会话存储: {backend}')
+
+
+# ========== 内存缓存 ==========
+
+class SessionCache:
+    """线程安全的 LRU 缓存：sid -> (序列化数据, 过期时间, 缓存时间)"""
+
+    def __init__(self, size=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_SECONDS):
+        self.size = size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            item = self._items.get(sid)
+            if item is None:
+                return None
+            if time.monotonic() - item[2] > self.ttl:
+                del self._items[sid]
+                return None
+            self._items.move_to_end(sid)
+            return item[0], item[1]
+
+    def put(self, sid, data, expires_at):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[sid] = (data, expires_at, time.monotonic())
+            self._items.move_to_end(sid)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def discard(self, sid):
+        with self._lock:
+            self._items.pop(sid, None)
+
+
+# ========== SessionInterface ==========
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store, cache=None):
+        self.store = store
+        self.cache = cache if cache is not None else SessionCache()
+
+    def _load(self, sid):
+        cached = self.cache.get(sid)
+        if cached is not None:
+            data, expires_at = cached
+        else:
+            stored = self.store.load(sid)
+            if stored is None:
+                return None
+            data, expires_at = stored
+            self.cache.put(sid, data, expires_at)
+        if expires_at <= datetime.utcnow():
+            self.cache.discard(sid)
+            return None
+        return ServerSideSession(serializer.loads(data), sid=sid, expires_at=expires_at)
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-session')
+
+    def _unsign(self, app, cookie):
+        try:
+            return self._signer(app).unsign(cookie).decode('ascii')
+        except BadSignature:
+            return None
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        sid = self._unsign(app, cookie) if cookie else None
+        if sid:
+            session = self._load(sid)
+            if session is not None:
+                return session
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                self.cache.discard(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = datetime.utcnow()
+        lifetime = app.permanent_session_lifetime
+        # 内容未变且剩余有效期超过一半时不写存储
+        if not session.modified and session.expires_at - now > lifetime / 2:
+            return
+
+        if session.rotate:
+            self.store.delete(session.sid)
+            self.cache.discard(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.rotate = False
+
+        data = serializer.dumps(dict(session))
+        expires_at = now + lifetime
+        self.store.save(session.sid, data, session.get('user_id'), expires_at)
+        self.cache.put(session.sid, data, expires_at)
+        session.expires_at = expires_at
+        response.set_cookie(
+            name, self._signer(app).sign(session.sid).decode('ascii'),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app))
+
+    def logout_everywhere(self, user_id):
+        """作废用户在所有设备上的会话，返回作废的会话数"""
+        sids = self.store.delete_user(user_id)
+        for sid in sids:
+            self.cache.discard(sid)
+        return len(sids)
+
+    def purge_expired(self):
+        return self.store.purge_expired()
+
+
+def init_app(app):
+    app.config.setdefault('SESSION_BACKEND', os.environ.get('SESSION_BACKEND', 'sql'))
+    app.config.setdefault('SESSION_REDIS_URL', os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0'))
+    app.session_interface = ServerSessionInterface(create_store(app))
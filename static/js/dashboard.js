@@ -0,0 +1,104 @@
+$(document).ready(function() {
+    // 卡片悬停效果
+    $('.feature-card').hover(function() {
+        $(this).css('transform', 'translateY(-8px)');
+    }, function() {
+        $(this).css('transform', 'translateY(0)');
+    });
+    
+    // 文档卡片悬停效果
+    $('.doc-card').hover(function() {
+        $(this).css('box-shadow', '0 8px 18px rgba(0, 0, 0, 0.1)');
+    }, function() {
+        $(this).css('box-shadow', '0 4px 10px rgba(0, 0, 0, 0.05)');
+    });
+    
+    // 错误处理：当创建文档按钮点击出错时
+    $('#createFirstDoc').click(function(e) {
+        e.preventDefault();
+        
+        // 显示加载状态
+        $(this).html('<i class="fas fa-spinner fa-spin"></i> 处理中...');
+        
+        // 尝试访问提交文档页面
+        $.ajax({
+            url: '/submit_document',
+            type: 'GET',
+            success: function() {
+                window.location.href = '/submit_document';
+            },
+            error: function(xhr) {
+                // 恢复按钮状态
+                $('#createFirstDoc').html('<i class="fas fa-plus"></i> 创建第一个文档');
+                
+                // 显示错误消息
+                let errorMsg = "加载提交页面时出错，请重试";
+                if (xhr.status === 500) {
+                    errorMsg = "服务器内部错误，请稍后再试";
+                } else if (xhr.status === 404) {
+                    errorMsg = "页面未找到，请联系管理员";
+                }
+                
+                $('.error-detail').text(errorMsg);
+                $('.error-message').fadeIn();
+                
+                // 5秒后自动隐藏错误消息
+                setTimeout(function() {
+                    $('.error-message').fadeOut();
+                }, 5000);
+            }
+        });
+    });
+    
+    // 监控系统状态
+    function checkSystemStatus() {
+        $.ajax({
+            url: '/api/system_status',
+            type: 'GET',
+            success: function(data) {
+                if (data.status === 'good') {
+                    $('.system-status').removeClass('status-warning').addClass('status-good').text('系统运行正常');
+                } else {
+                    $('.system-status').removeClass('status-good').addClass('status-warning').text('系统部分功能受限');
+                }
+            },
+            error: function() {
+                $('.system-status').removeClass('status-good').addClass('status-warning').text('状态检查失败');
+            }
+        });
+    }
+    
+    // 月度收益图表（读取预计算的月度汇总）
+    function loadMonthlyEarnings() {
+        $.getJSON('/api/transactions/monthly', { months: 6 }, function(rollups) {
+            const $container = $('#monthlyEarnings').empty();
+            if (rollups.length === 0) {
+                $container.html('<p class="text-muted small mb-0">暂无收支记录</p>');
+                return;
+            }
+            const maxValue = Math.max(1, ...rollups.map(r => r.income + r.rewards));
+            rollups.forEach(function(r) {
+                const earned = r.income + r.rewards - r.fees;
+                $container.append(`
+                    <div class="mb-2">
+                        <div class="d-flex justify-content-between small">
+                            <span>${r.month}</span>
+                            <span>净收益 ${earned} 分</span>
+                        </div>
+                        <div class="progress">
+                            <div class="progress-bar bg-success" style="width: ${r.income / maxValue * 100}%" title="文档收入 ${r.income}"></div>
+                            <div class="progress-bar bg-warning" style="width: ${r.rewards / maxValue * 100}%" title="奖励 ${r.rewards}"></div>
+                        </div>
+                    </div>
+                `);
+            });
+        }).fail(function() {
+            $('#monthlyEarnings').html('<p class="text-muted small mb-0">月度收益加载失败</p>');
+        });
+    }
+    loadMonthlyEarnings();
+    
+    // 每30秒检查一次系统状态
+    checkSystemStatus();
+    setInterval(checkSystemStatus, 30000);
+});
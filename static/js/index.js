@@ -0,0 +1,111 @@
+// 生成随机颜色的函数（用于头像背景）
+function getRandomColor() {
+    const colors = ['#e3f2fd', '#fff8e1', '#f1f8e9', '#fce4ec', '#e8f5e9'];
+    return colors[Math.floor(Math.random() * colors.length)];
+}
+
+// 排序功能
+$(document).ready(function() {
+    $('#sortBtn').click(function() {
+        const $list = $('#documentsList');
+        const $items = $list.children('.list-group-item');
+        
+        $items.sort(function(a, b) {
+            const priceA = parseInt($(a).find('.badge-price').text());
+            const priceB = parseInt($(b).find('.badge-price').text());
+            return priceA - priceB;
+        });
+        
+        $list.empty().append($items);
+    });
+    
+    // 指南展开/收起
+    $('.guide-toggle').click(function() {
+        $(this).toggleClass('collapsed');
+        $(this).find('i').toggleClass('fa-chevron-up fa-chevron-down');
+        $(this).text($(this).text() === '收起指南' ? '展开指南' : '收起指南');
+    });
+    
+    // 加载更早的社区动态
+    $('#loadMorePosts').click(function(e) {
+        e.preventDefault();
+        const $button = $(this);
+        const before = $button.data('before');
+        if (!before) {
+            return;
+        }
+        $.getJSON('/api/community_posts', { before: before, limit: 10 }, function(data) {
+            data.items.forEach(function(post) {
+                const $item = $('<div class="feed-item"><div class="d-flex">' +
+                    '<div class="feed-avatar me-2"><div class="avatar-circle"></div></div>' +
+                    '<div class="feed-content"><div class="feed-header"><strong></strong>' +
+                    '<small class="text-muted ms-2"></small></div><div class="feed-text"></div></div>' +
+                    '</div></div>');
+                $item.find('.avatar-circle').css('background-color', getRandomColor()).text(post.username.charAt(0));
+                $item.find('strong').text(post.username);
+                $item.find('small').text(post.created_at);
+                $item.find('.feed-text').text(post.content);
+                $('#communityFeed').append($item);
+            });
+            if (data.next_before) {
+                $button.data('before', data.next_before);
+            } else {
+                $button.replaceWith('<span class="text-muted small">没有更早的动态了</span>');
+            }
+        });
+    });
+    
+    // 社区发布功能：同一条动态的重复点击使用同一个幂等键，发布成功后换新键
+    function newIdempotencyKey() {
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+    let postIdempotencyKey = newIdempotencyKey();
+    $('#postButton').click(function() {
+        const content = $('#quickPost').val().trim();
+        if (!content) {
+            alert('请输入内容');
+            return;
+        }
+        
+        // 发送AJAX请求到后端
+        $.ajax({
+            url: '/add_community_post',
+            type: 'POST',
+            headers: { 'Idempotency-Key': postIdempotencyKey },
+            data: { content: content },
+            success: function(response) {
+                if (response.success) {
+                    // 成功后的处理
+                    const newPost = `
+                        <div class="feed-item">
+                            <div class="d-flex">
+                                <div class="feed-avatar me-2">
+                                    <div class="avatar-circle" style="background-color: ${getRandomColor()}">
+                                        ${response.username.charAt(0)}
+                                    </div>
+                                </div>
+                                <div class="feed-content">
+                                    <div class="feed-header">
+                                        <strong>${response.username}</strong>
+                                        <small class="text-muted ms-2">${response.created_at}</small>
+                                    </div>
+                                    <div class="feed-text">
+                                        ${response.content}
+                                    </div>
+                                </div>
+                            </div>
+                        </div>
+                    `;
+                    $('#communityFeed').prepend(newPost);
+                    $('#quickPost').val('');
+                    postIdempotencyKey = newIdempotencyKey();
+                } else {
+                    alert('发布失败: ' + response.error);
+                }
+            },
+            error: function() {
+                alert('网络错误，请重试');
+            }
+        });
+    });
+});
@@ -0,0 +1,36 @@
+"""系统统计快照
+
+统计页面需要的用户数、已批准文档数和流通积分都要整表聚合，
+改为由定时任务（tasks.py）每隔 STATS_REFRESH_SECONDS 秒重算一次写入 stats_snapshot，
+页面只读取快照这一行，并显示数据更新时间。
+"""
+from datetime import datetime
+
+from models import db, User, Document, SystemStats, StatsSnapshot
+
+SNAPSHOT_ID = 1
+
+
+def refresh_snapshot():
+    """重算统计并写入快照，返回快照对象"""
+    stats = SystemStats.query.first()
+    snapshot = StatsSnapshot.query.get(SNAPSHOT_ID) or StatsSnapshot(id=SNAPSHOT_ID)
+    snapshot.users = User.query.count()
+    snapshot.approved_documents = Document.query.filter_by(status='approved').count()
+    snapshot.points_in_circulation = db.session.query(db.func.sum(User.points)).scalar() or 0
+    snapshot.total_points_created = stats.total_points_created or 0
+    snapshot.total_fees_collected = stats.total_fees_collected or 0
+    snapshot.total_rewards_given = stats.total_rewards_given or 0
+    snapshot.refreshed_at = datetime.utcnow()
+    db.session.add(snapshot)
+    db.session.commit()
+    return snapshot
+
+
+def get_snapshot():
+    """读取快照；还没有快照时（定时任务尚未运行）同步生成一次"""
+    return StatsSnapshot.query.get(SNAPSHOT_ID) or refresh_snapshot()
+
+
+def snapshot_age_seconds(snapshot):
+    return max(0, int((datetime.utcnow() - snapshot.refreshed_at).total_seconds()))
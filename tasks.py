@@ -0,0 +1,114 @@
+"""后台定时任务
+
+与 Web 进程分开单独运行一个实例：
+
+    python tasks.py
+
+任务间隔通过环境变量配置，例如 STATS_REFRESH_SECONDS=60。
+"""
+import functools
+import os
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+from app import app
+import archive
+import backup
+import classify
+import idempotency
+import ranking
+import related
+import replicas
+import stats
+
+STATS_REFRESH_SECONDS = int(os.environ.get('STATS_REFRESH_SECONDS', 60))
+SESSION_PURGE_SECONDS = int(os.environ.get('SESSION_PURGE_SECONDS', 3600))
+CLASSIFY_SWEEP_SECONDS = int(os.environ.get('CLASSIFY_SWEEP_SECONDS', 300))
+RELATED_REFRESH_SECONDS = int(os.environ.get('RELATED_REFRESH_SECONDS', 1800))
+HOT_SCORE_REFRESH_SECONDS = int(os.environ.get('HOT_SCORE_REFRESH_SECONDS', 120))
+BACKUP_INTERVAL_SECONDS = int(os.environ.get('BACKUP_INTERVAL_SECONDS', 86400))
+IDEMPOTENCY_PURGE_SECONDS = int(os.environ.get('IDEMPOTENCY_PURGE_SECONDS', 3600))
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get('ARCHIVE_INTERVAL_SECONDS', 3600))
+
+
+def in_app_context(func):
+    """定时任务在应用上下文中执行，结束后释放数据库会话"""
+    @functools.wraps(func)
+    def job():
+        with app.app_context():
+            try:
+                func()
+            except Exception as e:
+                app.logger.error(f"定时任务 {func.__name__} 出错: {str(e)}")
+    return job
+
+
+def purge_expired_sessions():
+    deleted = app.session_interface.purge_expired()
+    if deleted:
+        app.logger.info(f"已删除 {deleted} 个过期会话")
+
+
+def purge_idempotency_keys():
+    deleted = idempotency.purge_expired()
+    if deleted:
+        app.logger.info(f"已删除 {deleted} 条过期幂等记录")
+
+
+def backup_database():
+    archive = backup.run_backup()
+    app.logger.info(f"数据库已备份: {archive}")
+
+
+def sync_replica():
+    path = replicas.replica_path(app)
+    if path:
+        backup.refresh_replica(path)
+
+
+def archive_old_rows():
+    moved = archive.run()
+    if any(moved.values()):
+        app.logger.info(f"已归档: {moved}")
+
+
+def create_scheduler():
+    scheduler = BlockingScheduler()
+    scheduler.add_job(in_app_context(stats.refresh_snapshot), 'interval',
+                      seconds=STATS_REFRESH_SECONDS, id='refresh_stats_snapshot',
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(in_app_context(purge_expired_sessions), 'interval',
+                      seconds=SESSION_PURGE_SECONDS, id='purge_expired_sessions',
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(in_app_context(purge_idempotency_keys), 'interval',
+                      seconds=IDEMPOTENCY_PURGE_SECONDS, id='purge_idempotency_keys',
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(in_app_context(classify.sweep), 'interval',
+                      seconds=CLASSIFY_SWEEP_SECONDS, id='classify_sweep',
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(in_app_context(related.refresh), 'interval',
+                      seconds=RELATED_REFRESH_SECONDS, id='refresh_related_documents',
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(in_app_context(ranking.refresh), 'interval',
+                      seconds=HOT_SCORE_REFRESH_SECONDS, id='refresh_hot_scores',
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(in_app_context(backup_database), 'interval',
+                      seconds=BACKUP_INTERVAL_SECONDS, id='backup_database',
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(in_app_context(archive_old_rows), 'interval',
+                      seconds=ARCHIVE_INTERVAL_SECONDS, id='archive_old_rows',
+                      max_instances=1, coalesce=True)
+    if replicas.replica_path(app):
+        scheduler.add_job(in_app_context(sync_replica), 'interval',
+                          seconds=replicas.REPLICA_SYNC_SECONDS, id='sync_replica',
+                          max_instances=1, coalesce=True)
+    return scheduler
+
+
+if __name__ == '__main__':
+    scheduler = create_scheduler()
+    # 启动时先刷新一次，避免等待第一个间隔
+    for job in scheduler.get_jobs():
+        job.func()
+    print(f"后台任务已启动: {[job.id for job in scheduler.get_jobs()]}")
+    scheduler.start()
@@ -0,0 +1,193 @@
+"""社区动态时间线
+
+首页只展示最新的几条社区动态，这里维护一个定长的时间线（最新 TIMELINE_SIZE 条），
+用户名直接存在条目中，读取时不查询数据库：
+
+- TIMELINE_BACKEND=memory（默认）：进程内环形缓冲区。首次使用时从表中重建；
+  其他进程写入的动态通过每 TIMELINE_SYNC_SECONDS 秒一次的增量查询（id 大于上次同步到的 id）补齐；
+  本进程 push() 的动态不推进同步位置，其他进程提交的 id 更小的动态下次同步时仍会读到，按时间顺序合并、去重
+- TIMELINE_BACKEND=redis：Redis 列表，所有进程共享，写入即可见
+
+add_community_post() 提交后调用 push() 更新时间线；更早的动态由 older_posts() 翻页，
+超出时间线范围时回退到数据库按 (created_at, id) 分页。
+"""
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from models import db, User, CommunityPost
+
+TIMELINE_SIZE = int(os.environ.get('TIMELINE_SIZE', 200))
+TIMELINE_SYNC_SECONDS = float(os.environ.get('TIMELINE_SYNC_SECONDS', 5))
+REDIS_KEY = 'timeline:community'
+
+TimelinePost = namedtuple('TimelinePost', ['id', 'content', 'user_id', 'username', 'created_at'])
+
+
+def _posts_query():
+    return db.session.query(CommunityPost.id, CommunityPost.content, CommunityPost.user_id,
+                            User.username, CommunityPost.created_at) \
+        .join(User, User.id == CommunityPost.user_id)
+
+
+def _fetch(query):
+    return [TimelinePost(*row) for row in query.all()]
+
+
+def load_latest(limit):
+    """从表中读取最新 limit 条，按时间倒序"""
+    return _fetch(_posts_query()
+                  .order_by(CommunityPost.created_at.desc(), CommunityPost.id.desc())
+                  .limit(limit))
+
+
+def load_before(post, limit):
+    """从表中读取早于 post 的 limit 条"""
+    return _fetch(_posts_query()
+                  .filter(db.or_(
+                      CommunityPost.created_at < post.created_at,
+                      db.and_(CommunityPost.created_at == post.created_at, CommunityPost.id < post.id)))
+                  .order_by(CommunityPost.created_at.desc(), CommunityPost.id.desc())
+                  .limit(limit))
+
+
+class MemoryTimeline:
+    def __init__(self, size=TIMELINE_SIZE, sync_seconds=TIMELINE_SYNC_SECONDS):
+        self.size = size
+        self.sync_seconds = sync_seconds
+        self._posts = deque(maxlen=size)  # 左端最新
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._synced_at = 0
+        self._synced_id = 0  # 从表中同步到的最大 id，只由 rebuild() 和 _sync() 推进
+
+    def _merge(self, posts):
+        """按 (created_at, id) 倒序合并新动态，已有的跳过，超出容量的最早的丢弃"""
+        known = {p.id for p in self._posts}
+        new = [p for p in posts if p.id not in known]
+        if not new:
+            return
+        merged = sorted([*self._posts, *new], key=lambda p: (p.created_at, p.id), reverse=True)
+        self._posts.clear()
+        self._posts.extend(merged[:self.size])
+
+    def rebuild(self):
+        posts = load_latest(self.size)
+        with self._lock:
+            self._posts.clear()
+            self._posts.extend(posts)
+            self._synced_id = max((p.id for p in posts), default=0)
+            self._loaded = True
+            self._synced_at = time.monotonic()
+
+    def _sync(self):
+        """补齐其他进程写入的动态"""
+        if not self._loaded:
+            self.rebuild()
+            return
+        if time.monotonic() - self._synced_at < self.sync_seconds:
+            return
+        posts = _fetch(_posts_query().filter(CommunityPost.id > self._synced_id)
+                       .order_by(CommunityPost.id).limit(self.size))
+        with self._lock:
+            self._merge(posts)
+            if posts:
+                self._synced_id = max(self._synced_id, posts[-1].id)
+            self._synced_at = time.monotonic()
+
+    def push(self, post):
+        with self._lock:
+            if self._loaded:
+                self._merge([post])
+
+    def posts(self):
+        self._sync()
+        with self._lock:
+            return list(self._posts)
+
+
+class RedisTimeline:
+    def __init__(self, url, size=TIMELINE_SIZE):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+        self.size = size
+
+    @staticmethod
+    def _dumps(post):
+        return json.dumps(dict(post._asdict(), created_at=post.created_at.isoformat()))
+
+    @staticmethod
+    def _loads(raw):
+        data = json.loads(raw)
+        data['created_at'] = datetime.fromisoformat(data['created_at'])
+        return TimelinePost(**data)
+
+    def rebuild(self):
+        posts = load_latest(self.size)
+        with self.redis.pipeline() as pipe:
+            pipe.delete(REDIS_KEY)
+            if posts:
+                pipe.rpush(REDIS_KEY, *[self._dumps(p) for p in posts])
+            pipe.execute()
+
+    def push(self, post):
+        with self.redis.pipeline() as pipe:
+            # 列表不存在时不写入，下次读取时从表中完整重建
+            pipe.lpushx(REDIS_KEY, self._dumps(post))
+            pipe.ltrim(REDIS_KEY, 0, self.size - 1)
+            pipe.execute()
+
+    def posts(self):
+        if not self.redis.exists(REDIS_KEY):
+            self.rebuild()
+        return [self._loads(raw) for raw in self.redis.lrange(REDIS_KEY, 0, -1)]
+
+
+_timeline = None
+
+
+def init_app(app):
+    global _timeline
+    backend = app.config.setdefault('TIMELINE_BACKEND', os.environ.get('TIMELINE_BACKEND', 'memory'))
+    if backend == 'redis':
+        url = app.config.setdefault('TIMELINE_REDIS_URL', os.environ.get('TIMELINE_REDIS_URL', 'redis://localhost:6379/0'))
+        _timeline = RedisTimeline(url)
+    elif backend == 'memory':
+        _timeline = MemoryTimeline()
+    else:
+        raise ValueError(f'未知的时间线存储: {backend}')
+
+
+def push(post, username):
+    """新动态提交后调用"""
+    _timeline.push(TimelinePost(post.id, post.content, post.user_id, username, post.created_at))
+
+
+def latest(limit=10):
+    return _timeline.posts()[:limit]
+
+
+def _page(posts, limit):
+    return posts[:limit], (posts[limit - 1].id if len(posts) > limit else None)
+
+
+def older_posts(before_id=None, limit=20):
+    """返回 (动态列表, 下一页的 before_id)；时间线中不够一页时从表中补足"""
+    posts = _timeline.posts()
+    anchor = None
+    if before_id is not None:
+        index = next((i for i, p in enumerate(posts) if p.id == before_id), None)
+        if index is None:
+            # 已翻出时间线范围，直接按表分页
+            anchor = CommunityPost.query.get(before_id)
+            return _page(load_before(anchor, limit + 1) if anchor else [], limit)
+        anchor, posts = posts[index], posts[index + 1:]
+    page = posts[:limit + 1]
+    if len(page) <= limit:
+        last = page[-1] if page else anchor
+        if last is not None:
+            page += load_before(last, limit + 1 - len(page))
+    return _page(page, limit)